@@ -1,11 +1,14 @@
 from PySide6.QtCore import Slot
 from PySide6.QtGui import Qt
-from PySide6.QtWidgets import QMainWindow, QTabWidget, QDockWidget, QListWidget, QListWidgetItem, QMessageBox
+from PySide6.QtWidgets import QMainWindow, QTabWidget, QDockWidget, QListWidget, QListWidgetItem, QMessageBox, \
+    QFileDialog
 
 import tools
 from LogView import LogView
 from SettingDialog import SettingDialog
-from init import printLog, VERSION
+from init import printLog, VERSION, cfg
+from lib.RBKMetrics import metrics
+from lib.RBKUtils import RBKUtils
 
 
 class MainWindow(QMainWindow):
@@ -19,6 +22,11 @@ class MainWindow(QMainWindow):
         # menu
         menu = self.menuBar().addMenu("文件")
         menu.addAction("设置", lambda: SettingDialog().exec())
+        metricsAction = menu.addAction("记录通信统计")
+        metricsAction.setCheckable(True)
+        metricsAction.toggled.connect(self.slotMetricsToggled)
+        metricsAction.setChecked(cfg["RBKMetrics", "enable"] == "True")
+        menu.addAction("导出通信统计", self.slotExportMetrics)
         self.menuBar().addAction("关于", self.aboutShow)
         # 中间是主要工作窗口
         self.tabWidget = QTabWidget(self)
@@ -66,6 +74,20 @@ class MainWindow(QMainWindow):
         printLog(f"删除一个 Tab【{self.tabWidget.tabText(index)}】 位置 {index + 1}")
         self.tabWidget.removeTab(index)
 
+    @Slot(bool)
+    def slotMetricsToggled(self, checked):
+        RBKUtils.instrument = metrics if checked else None
+        if cfg["RBKMetrics", "enable"] != str(checked):
+            cfg["RBKMetrics", "enable"] = checked
+
+    @Slot()
+    def slotExportMetrics(self):
+        file = QFileDialog.getSaveFileName(self, "导出通信统计", "rbk_metrics.json", "json file (*.json)")
+        if not file[0]:
+            return
+        metrics.dump(file[0])
+        printLog(f"导出通信统计 {file[0]}")
+
     @Slot()
     def aboutShow(self):
         QMessageBox.about(self, "关于", f"<h3 style='text-align: center;'>生产工具</h3>"
@@ -0,0 +1,177 @@
+"""
+lib/RBKUtils.py 的基准测试，对本机模拟机器人 (lib/RBKSimulator.py) 发请求
+
+    python -m benchmarks.bench_rbkutils --output bench.json
+
+结果写成 JSON，可以在不同版本之间对比
+"""
+import argparse
+import asyncio
+import json
+import platform
+import socket
+import statistics
+import threading
+import time
+from datetime import datetime
+
+from lib.RBKSimulator import RBKSimulator, SimulatorConfig
+from lib.RBKUtils import RBKUtils
+
+MB = 1024 * 1024
+
+
+def opsPerSec(fn, seconds):
+    n = 0
+    start = time.perf_counter()
+    end = start + seconds
+    while True:
+        for _ in range(100):
+            fn()
+        n += 100
+        now = time.perf_counter()
+        if now >= end:
+            return n / (now - start)
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+
+    def p(q):
+        return samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": p(0.50),
+        "p90_ms": p(0.90),
+        "p99_ms": p(0.99),
+        "max_ms": samples[-1] * 1000
+    }
+
+
+def benchPack(seconds):
+    js = {"type": "getRBKStatus"}
+    data = bytes(MB)
+    frame = RBKUtils.pack(5136, js)
+    header = frame[:16]
+    return {
+        "pack_small_ops": opsPerSec(lambda: RBKUtils.pack(5136, js), seconds),
+        "pack_1MB_ops": opsPerSec(lambda: RBKUtils.pack(5136, js, data), seconds),
+        "packBuffers_1MB_ops": opsPerSec(lambda: RBKUtils.packBuffers(5136, js, data), seconds),
+        "unpack_ops": opsPerSec(lambda: RBKUtils.unpack(header), seconds)
+    }
+
+
+class SimulatorThread(threading.Thread):
+    """
+    在后台线程的事件循环里运行模拟机器人
+    """
+
+    def __init__(self, config: SimulatorConfig, ip, port):
+        super().__init__(daemon=True)
+        self.config = config
+        self.ip = ip
+        self.port = port
+        self.loop = asyncio.new_event_loop()
+        self.simulator = RBKSimulator(config)
+        self.ready = threading.Event()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.simulator.start(self.ip, 1, (self.port,)))
+        self.ready.set()
+        self.loop.run_forever()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.simulator.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+def benchRequest(ip, port, count):
+    so = socket.create_connection((ip, port))
+    so.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    for _ in range(min(100, count)):
+        RBKUtils.request(so, 5041)
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        RBKUtils.request(so, 5041)
+        samples.append(time.perf_counter() - start)
+    so.close()
+    return percentiles(samples)
+
+
+def benchPipeline(ip, port, count, batch=5):
+    so = socket.create_connection((ip, port))
+    so.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    samples = []
+    for _ in range(count // batch):
+        start = time.perf_counter()
+        RBKUtils.pipeline(so, [(5041,)] * batch)
+        samples.append(time.perf_counter() - start)
+    so.close()
+    res = percentiles(samples)
+    res["batch"] = batch
+    return res
+
+
+def benchDownload(ip, port, repeat):
+    so = socket.create_connection((ip, port))
+    size = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        _, data = RBKUtils.request(so, 1000)
+        size += len(data)
+    elapsed = time.perf_counter() - start
+    so.close()
+    return {"bytes": size, "seconds": elapsed, "MBps": size / MB / elapsed}
+
+
+def benchUpload(ip, port, size, repeat):
+    data = bytes(size)
+    so = socket.create_connection((ip, port))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        RBKUtils.request(so, 5106, None, data)
+    elapsed = time.perf_counter() - start
+    so.close()
+    return {"bytes": size * repeat, "seconds": elapsed, "MBps": size * repeat / MB / elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RBKUtils 基准测试")
+    parser.add_argument("--output", default="bench_rbkutils.json", help="结果 JSON 文件")
+    parser.add_argument("--ip", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=29208)
+    parser.add_argument("--seconds", type=float, default=1.0, help="每项 pack/unpack 测试的时长")
+    parser.add_argument("--requests", type=int, default=2000, help="延时测试的请求数")
+    parser.add_argument("--body-mb", type=int, default=16, help="大报文测试的报文体大小（MB）")
+    parser.add_argument("--repeat", type=int, default=5, help="大报文测试的次数")
+    args = parser.parse_args()
+
+    config = SimulatorConfig()
+    config.payloadSize = args.body_mb * MB
+    server = SimulatorThread(config, args.ip, args.port)
+    server.start()
+    server.ready.wait()
+
+    result = {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pack": benchPack(args.seconds),
+        "request_latency": benchRequest(args.ip, args.port, args.requests),
+        "pipeline_latency": benchPipeline(args.ip, args.port, args.requests),
+        "download": benchDownload(args.ip, args.port, args.repeat),
+        "upload": benchUpload(args.ip, args.port, args.body_mb * MB, args.repeat)
+    }
+    server.stop()
+
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
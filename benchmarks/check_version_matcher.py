@@ -0,0 +1,101 @@
+"""
+lib/VersionMatcher.py 的规则自检，逐条运行 compileClause 文档中列出的写法，并编译版本配置表的每个单元格
+
+    python -m benchmarks.check_version_matcher --sheet RBKVersion/version.xlsx
+
+有不符合预期的结果或配置表中有无效规则时以非 0 退出
+"""
+import argparse
+import os
+import sys
+
+from lib.VersionMatcher import Rule, VersionMatcher, versionKey
+from lib.VersionSheet import VersionSheet
+
+# (规则, 机器人上报的版本, 是否一致)
+CASES = [
+    ("3.4.6.2105", "3.4.6.2105", True),
+    ("3.4.6.2105", "3.4.6.2106", False),
+    ("3.4.6.*", "3.4.6.18", True),
+    ("3.4.6.*", "3.4.7.1", False),
+    ("f103-1.5.?", "F103-1.5.2", True),
+    ("3.4.6.2000~3.4.6.2200", "3.4.6.2105", True),
+    ("3.4.6.2000~3.4.6.2200", "3.4.6.18", False),
+    (">=3.4.6,<3.5", "3.4.6.18", True),
+    (">=3.4.6,<3.5", "3.5.0", False),
+    (">=3.4.6,<3.5", "v3.4.7", True),
+    ("f103-1.5.0~f103-1.6.0", "f103-1.5.2", True),
+    ("f103-1.5.0~f103-1.6.0", "f103-9.9.9", False),
+    ("f103-1.5.0~f103-1.6.0", "m40-1.5.2", False),
+    (">=f103-1.5.0", "f103-1.4.9", False),
+    (">=f103-1.5.0", "m40-1.6.0", False),
+    (">=f103-1.5.0", "f103-1.6.0", True),
+    ("*", "", True),
+    ("*", "anything", True),
+    ("-", "", True),
+    ("-", "-", True),
+    ("-", "0.0.7.6", False),
+    ("3.4.6.18|3.4.6.2105", "3.4.6.2105", True),
+    ("3.4.6.18|f103-1.5.0~f103-1.6.0", "f103-1.5.1", True),
+    ("3.4.6.18|f103-1.5.0~f103-1.6.0", "m40-1.5.1", False),
+    ("", "3.4.6.18", False),
+]
+
+VERSION_KEYS = [
+    ("3.4.6.2105", ("", (3, 4, 6, 2105))),
+    ("v1.6.3", ("", (1, 6, 3))),
+    ("f103-1.5.2", ("f103", (1, 5, 2))),
+    ("M40-1.5.4", ("m40", (1, 5, 4))),
+    ("3.4.6-beta", None),
+]
+
+INVALID = ["f103-1.5.0~m40-1.6.0", ">=abc", "1.0~"]
+
+
+def checkRules():
+    failures = []
+    for text, expected in VERSION_KEYS:
+        if versionKey(text) != expected:
+            failures.append(f"versionKey({text!r}) = {versionKey(text)!r}，应为 {expected!r}")
+    for text, actual, expected in CASES:
+        result = Rule(text).match(actual)
+        if result != expected:
+            failures.append(f"{text!r} 匹配 {actual!r} = {result}，应为 {expected}")
+    for text in INVALID:
+        try:
+            Rule(text)
+            failures.append(f"{text!r} 应为无效规则")
+        except ValueError:
+            pass
+    return failures
+
+
+def checkSheet(xlsx):
+    """
+    编译配置表中所有列，无效规则返回错误信息
+    """
+    sheet = VersionSheet.parse(xlsx)
+    try:
+        # 只检查规则能否编译，组件名用行号代替
+        matcher = VersionMatcher(sheet, [str(i) for i in range(len(sheet.rows))])
+    except ValueError as e:
+        return [str(e)]
+    print(f"{xlsx}：{len(matcher.rules)} 个 SRC 类型")
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="版本规则自检")
+    parser.add_argument("--sheet", default=os.path.join("RBKVersion", "version.xlsx"), help="要编译的版本配置表，不存在时跳过")
+    args = parser.parse_args()
+    failures = checkRules()
+    print(f"规则用例 {len(CASES) + len(VERSION_KEYS) + len(INVALID)} 条，失败 {len(failures)} 条")
+    if os.path.exists(args.sheet):
+        failures += checkSheet(args.sheet)
+    for failure in failures:
+        print("失败：", failure)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
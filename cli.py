@@ -0,0 +1,204 @@
+"""
+命令行批量执行，不创建界面
+
+    python cli.py upgrade --package RBKPackage/xxx.zip 192.168.192.0/24 @ips.txt -j 16
+    python cli.py validate 192.168.192.10-20 --sheet RBKVersion/version.xlsx --report audit.xlsx
+    python cli.py activate 192.168.192.5
+    python cli.py export -f ips.txt --out ExportRobotInfo --render
+
+每台机器人的结果以一行 JSON 输出到 stdout，日志输出到 stderr
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from lib.IPUtils import parseTargets, loadTargetsFile
+
+__stdout__ = sys.stdout
+__outputLock__ = threading.Lock()
+
+
+def output(command, ip, ok, start, **kwargs):
+    line = {"command": command, "ip": ip, "ok": ok, "elapsed": round(time.monotonic() - start, 3)}
+    line.update(kwargs)
+    with __outputLock__:
+        __stdout__.write(json.dumps(line, ensure_ascii=False, default=str) + "\n")
+        __stdout__.flush()
+
+
+def forEach(command, ips, jobs, fn):
+    """
+    并发对每台机器人执行 fn(ip)，fn 返回结果 dict（含 "ok"），每台输出一行，返回成功的数量
+    """
+
+    def call(ip):
+        start = time.monotonic()
+        try:
+            res = fn(ip)
+        except Exception as e:
+            res = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        ok = res.pop("ok")
+        output(command, ip, ok, start, **res)
+        return ok
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return sum(1 for ok in executor.map(call, ips) if ok)
+
+
+def runUpgrade(args, ips):
+    from lib.PackageCatalog import PackageCatalog
+    from tools.FleetUpgradeRBK import FleetUpgrader
+    from tools.UpgradeRBK import packageDirectory
+
+    filePath = args.package
+    if not os.path.exists(filePath):
+        filePath = os.path.join(packageDirectory(), args.package)
+    if not os.path.exists(filePath):
+        raise FileNotFoundError(f"升级包不存在 {args.package}")
+    catalog = PackageCatalog(os.path.dirname(os.path.abspath(filePath)))
+    catalog.refresh()
+    starts = {}
+    states = {1: "success", 2: "failed", 3: "skipped"}
+
+    def onStatus(ip, text):
+        starts.setdefault(ip, time.monotonic())
+
+    def onResult(ip, state, upgrader):
+        output("upgrade", ip, state != 2, starts.get(ip, time.monotonic()), state=states.get(state, state),
+               status=upgrader.status, phases=[[p, round(t, 3)] for p, t in upgrader.phases],
+               upload=upgrader.meter.snapshot() if upgrader.meter is not None else None)
+
+    results = FleetUpgrader(ips, filePath, args.jobs, args.global_rate, args.group_rate, args.retries,
+                            args.skip_current, catalog.get(filePath), catalog if args.delta else None,
+                            onStatus, None, onResult).run()
+    return sum(1 for v in results.values() if v != 2)
+
+
+def runValidate(args, ips):
+    from init import printLog
+    from lib.VersionSheet import VersionSheet
+    from tools.RBKVersionValidator import auditRobot, versionMatcher, versionSheetPath
+    from tools.VersionAudit import writeReport
+
+    matcher = versionMatcher(VersionSheet.load(args.sheet or versionSheetPath()))
+    results = {}
+
+    def fn(ip):
+        res = auditRobot(ip, matcher)
+        results[ip] = dict(res)
+        del res["ip"]
+        return res
+
+    success = forEach("validate", ips, args.jobs, fn)
+    if args.report:
+        writeReport(args.report, [results[ip] for ip in ips if ip in results])
+        printLog(f"导出报告 {args.report}")
+    return success
+
+
+def runActivate(args, ips):
+    from tools.OnlineActivation import Thread
+
+    def fn(ip):
+        t = Thread()
+        t.ip = ip
+        t.run()
+        return {"ok": t.isSuccess, "response": t.response, "error": t.error}
+
+    return forEach("activate", ips, args.jobs, fn)
+
+
+def runExport(args, ips):
+    from tools.ExportRobotInfo import Thread, exportDirectory
+
+    def fn(ip):
+        t = Thread()
+        t.ip = ip
+        t.render = args.render
+        t.run()
+        if not t.isSuccess:
+            return {"ok": False, "error": "查询机器人信息失败"}
+        robotID = t.robotID or ip
+        directory = os.path.join(args.out, robotID + time.strftime("_%Y%m%d%H%M%S")) if args.out \
+            else exportDirectory(robotID)
+        t.exportTo(directory)
+        return {"ok": True, "robotID": t.robotID, "directory": os.path.abspath(directory), "timings": t.timings}
+
+    return forEach("export", ips, args.jobs, fn)
+
+
+COMMANDS = {
+    "upgrade": runUpgrade,
+    "validate": runValidate,
+    "activate": runActivate,
+    "export": runExport
+}
+
+
+def parseArgs(argv=None):
+    parser = argparse.ArgumentParser(description="RBK 工具命令行")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("targets", nargs="*", help="IP / CIDR / 范围 / @文件")
+    common.add_argument("-f", "--targets-file", action="append", default=[], help="IP 列表文件，可以重复")
+    common.add_argument("-j", "--jobs", type=int, default=8, help="并发数")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("upgrade", parents=[common], help="升级 RBK")
+    p.add_argument("--package", required=True, help="升级包路径或升级包目录中的文件名")
+    p.add_argument("--retries", type=int, default=3, help="网络中断时的重试次数")
+    p.add_argument("--global-rate", type=float, default=0, help="总上传带宽 MB/s，0 为不限")
+    p.add_argument("--group-rate", type=float, default=0, help="每个子网的上传带宽 MB/s，0 为不限")
+    p.add_argument("--skip-current", action="store_true", help="机器人已是目标版本（与升级包清单完全一致）时不上传")
+    p.add_argument("--delta", action="store_true", help="可以时使用增量包")
+
+    p = sub.add_parser("validate", parents=[common], help="RBK 版本验证")
+    p.add_argument("--sheet", help="版本配置表，默认使用界面中配置的路径")
+    p.add_argument("--report", help="写入核查报告（.csv 或 .xlsx）")
+
+    sub.add_parser("activate", parents=[common], help="在线激活")
+
+    p = sub.add_parser("export", parents=[common], help="导出机器人配置信息")
+    p.add_argument("--out", help="导出目录，默认使用界面中配置的目录")
+    p.add_argument("--render", action="store_true", help="同时生成信息图片（离屏渲染，较慢）")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parseArgs(argv)
+    ips = parseTargets(" ".join(args.targets))
+    for path in args.targets_file:
+        ips += [ip for ip in loadTargetsFile(path) if ip not in ips]
+    if not ips:
+        print("没有指定目标 IP", file=sys.stderr)
+        return 2
+
+    # 只有生成图片时需要 QApplication，其余命令不创建界面
+    if getattr(args, "render", False):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PySide6.QtWidgets import QApplication
+        app = QApplication(sys.argv[:1])
+    else:
+        from PySide6.QtCore import QCoreApplication
+        app = QCoreApplication(sys.argv[:1])
+
+    from init import clearn
+    from lib.ConnectionPool import pool
+    # printLog 输出到 stdout，改到 stderr，stdout 只输出 JSON 结果
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            success = COMMANDS[args.command](args, ips)
+        finally:
+            pool.clear()
+            clearn()
+    print(f"{args.command}: 成功 {success} / {len(ips)}", file=sys.stderr)
+    del app
+    return 0 if success == len(ips) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,172 @@
+import asyncio
+
+from init import printLog
+from lib.Codec import LazyJson
+from lib.FrameDecoder import FrameDecoder
+from lib.RBKUtils import RBKUtils
+
+
+class AsyncRBKClient:
+    """
+    基于 asyncio 的 RBK 客户端，报文格式与 RBKUtils 相同
+    一个事件循环可以同时连接上百台机器人
+    每个请求分配唯一的报文序号，可以连续发送多个请求，由读取任务按序号把响应交给对应的请求
+    """
+
+    def __init__(self, ip, port, timeout=60):
+        self.ip = ip
+        self.port = port
+        self.timeout = timeout
+        self.reader: asyncio.StreamReader = None
+        self.writer: asyncio.StreamWriter = None
+        self.readTask: asyncio.Task = None
+        self.pending = {}  # 序号 -> Future
+        self.lastId = 0
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.wait_for(asyncio.open_connection(self.ip, self.port), self.timeout)
+        self.readTask = asyncio.create_task(self.readLoop())
+
+    async def close(self):
+        if self.writer is None:
+            return
+        self.readTask.cancel()
+        self.failPending(ConnectionError("连接已关闭"))
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except OSError:
+            pass
+        self.writer = None
+        self.reader = None
+
+    async def readLoop(self):
+        """
+        持续读取响应，按报文序号交给等待中的请求
+        """
+        decoder = FrameDecoder()
+        try:
+            while True:
+                chunk = await self.reader.read(65536)
+                if not chunk:
+                    raise ConnectionError("连接已断开")
+                for header, jsonData, data in decoder.feed(chunk):
+                    future = self.pending.pop(header[2], None)
+                    if future is None or future.done():
+                        printLog("Unexpected frame:", header)
+                        continue
+                    future.set_result((jsonData, data))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failPending(e if isinstance(e, ConnectionError) else ConnectionError(str(e)))
+
+    def failPending(self, e: Exception):
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(e)
+        self.pending.clear()
+
+    def nextId(self):
+        for _ in range(0xFFFF):
+            self.lastId = self.lastId % 0xFFFF + 1
+            if self.lastId not in self.pending:
+                return self.lastId
+        raise RuntimeError("没有可用的报文序号")
+
+    def send(self, number, _json: dict = None, data: bytes = None):
+        """
+        发送请求但不等待，返回等待响应的 Future
+        """
+        if self.writer is None or self.readTask.done():
+            raise ConnectionError("连接已关闭")
+        id = self.nextId()
+        future = asyncio.get_running_loop().create_future()
+        self.pending[id] = future
+        self.writer.writelines(RBKUtils.packBuffers(number, _json, data, id))
+        return id, future
+
+    async def waitResponse(self, id, future: asyncio.Future):
+        try:
+            jsonData, data = await asyncio.wait_for(future, self.timeout)
+        finally:
+            self.pending.pop(id, None)
+        return LazyJson(jsonData), data
+
+    async def request(self, number, _json: dict = None, data: bytes = None):
+        id, future = self.send(number, _json, data)
+        await self.writer.drain()
+        return await self.waitResponse(id, future)
+
+    async def requestMany(self, requests: list):
+        """
+        连续发送多个请求后再等待响应，总耗时约为一次往返
+        requests: [(number, json, data), ...]，json 和 data 可以省略
+        返回与 requests 顺序一致的 [(js, data), ...]
+        """
+        sent = [self.send(*req) for req in requests]
+        await self.writer.drain()
+        return await asyncio.gather(*[self.waitResponse(id, future) for id, future in sent])
+
+    async def requestJson(self, number, _json: dict = None, data: bytes = None):
+        """
+        请求并把报文的数据区解析为 JSON
+        """
+        _, data = await self.request(number, _json, data)
+        return RBKUtils.loads(data)
+
+    # 19204
+    async def robotStatusInfo(self):
+        return await self.requestJson(1000)
+
+    async def robotStatusRunInfo(self):
+        return await self.requestJson(1002)
+
+    async def robotStatusBatteryInfo(self):
+        return await self.requestJson(1007)
+
+    async def robotStatusAlarmInfo(self):
+        return await self.requestJson(1050)
+
+    async def serviceRequest(self, js: dict):
+        return await self.requestJson(1999, js)
+
+    # 19208
+    async def robodVersionInfo(self):
+        return await self.requestJson(5041)
+
+    async def robotCoreStatusInfo(self):
+        return await self.requestJson(5011)
+
+    async def robodRequest(self, type, data: bytes = None):
+        return await self.request(5136, {"type": type}, data)
+
+    async def upgradeLegacy(self, data: bytes):
+        return await self.request(5104, None, data)
+
+    async def activeLegacy(self, data: bytes):
+        return await self.request(5106, None, data)
+
+
+async def forEachRobot(ips, fn, concurrency=256):
+    """
+    对每个 ip 执行 await fn(ip)，最多同时执行 concurrency 个
+    返回 {ip: 结果或异常}
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(ip):
+        async with semaphore:
+            try:
+                return ip, await fn(ip)
+            except Exception as e:
+                return ip, e
+
+    return dict(await asyncio.gather(*[run(ip) for ip in ips]))
@@ -0,0 +1,183 @@
+import ipaddress
+import threading
+import time
+from contextlib import contextmanager
+
+MB = 1024 * 1024
+
+
+class TokenBucket:
+    """
+    令牌桶，rate 为每秒令牌数（字节），rate <= 0 表示不限速
+    允许欠账：先发送再扣除，欠多少就等多久
+    """
+
+    def __init__(self, rate, burst=1.0):
+        self.rate = rate
+        self.burst = burst  # 桶容量 = rate * burst
+        self.tokens = rate * burst
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def setRate(self, rate):
+        with self.lock:
+            self.refill()
+            self.rate = rate
+            self.tokens = min(self.tokens, rate * self.burst)
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.rate * self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    def consume(self, n):
+        """
+        扣除 n 个令牌，返回需要等待的秒数
+        """
+        with self.lock:
+            if self.rate <= 0:
+                return 0
+            self.refill()
+            self.tokens -= n
+            return -self.tokens / self.rate if self.tokens < 0 else 0
+
+
+class Group:
+    def __init__(self, rate):
+        self.maxRate = rate
+        self.bucket = TokenBucket(rate)
+        self.active = 0
+        self.sentBytes = 0  # 当前统计窗口内发送的字节数
+        self.windowStart = time.monotonic()
+        self.observed = 0.0  # 观测到的吞吐量（字节/秒，指数平均）
+        self.lastActive = 0  # 上一个统计窗口结束时的上传数和吞吐量，用于判断加入上传后吞吐量是否还在增长
+        self.lastObserved = 0.0
+
+
+class BandwidthScheduler:
+    """
+    批量升级的上传带宽调度
+    全局和每个网络分组（默认按 /24 子网，也可以用 tags 指定 AP 标签）各有一个令牌桶限速
+    新的上传只有在带宽还有余量时才开始，按观测到的吞吐量自适应调整分组速率
+
+        with scheduler.admit(ip):
+            RBKUtils.requestView(..., onProgress=lambda sent, total: scheduler.throttle(ip, ...))
+    """
+
+    FLOOR = 0.25  # 自适应降速最低降到配置速率的这个比例
+
+    def __init__(self, globalRate=0, groupRate=0, minRate=1 * MB, tags: dict = None, adaptInterval=2.0):
+        self.globalBucket = TokenBucket(globalRate)
+        self.globalRate = globalRate
+        self.groupRate = groupRate
+        self.minRate = minRate  # 每个上传至少要分到的带宽
+        self.tags = tags or {}  # ip -> 分组标签
+        self.adaptInterval = adaptInterval
+        self.groups = {}
+        self.active = 0
+        self.total = Group(globalRate)  # 只用于统计全局吞吐量
+        self.cond = threading.Condition()
+
+    def groupOf(self, ip):
+        if ip in self.tags:
+            return self.tags[ip]
+        try:
+            return str(ipaddress.ip_network(f"{ip}/24", strict=False))
+        except ValueError:
+            return ip
+
+    def group(self, ip) -> Group:
+        key = self.groupOf(ip)
+        if key not in self.groups:
+            self.groups[key] = Group(self.groupRate)
+        return self.groups[key]
+
+    def hasRoom(self, group: Group):
+        """
+        按当前速率计算还能不能再加一个上传
+        """
+        if self.globalRate > 0 and (self.active + 1) * self.minRate > self.globalRate:
+            return self.active == 0
+        rate = group.bucket.rate
+        if rate > 0:
+            if (group.active + 1) * self.minRate > rate:
+                return group.active == 0
+            # 已经跑满的分组不再加入新的上传
+            if group.active > 0 and group.observed >= rate * 0.9:
+                return False
+        return True
+
+    @contextmanager
+    def admit(self, ip):
+        """
+        等待带宽有余量后开始一个上传
+        """
+        with self.cond:
+            group = self.group(ip)
+            while not self.hasRoom(group):
+                self.cond.wait(1.0)
+            group.active += 1
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self.cond:
+                group.active -= 1
+                self.active -= 1
+                self.cond.notify_all()
+
+    def throttle(self, ip, n):
+        """
+        记录已发送 n 字节，按全局和分组令牌桶等待
+        """
+        with self.cond:
+            group = self.group(ip)
+            group.sentBytes += n
+            self.total.sentBytes += n
+            self.observe(self.total)
+            self.adapt(group)
+        wait = max(self.globalBucket.consume(n), group.bucket.consume(n))
+        if wait > 0:
+            time.sleep(wait)
+
+    def adapt(self, group: Group):
+        """
+        根据观测吞吐量调整分组速率，调用时需持有 self.cond
+        只有多个上传同时进行、上传数增加后总吞吐量却不再增长，且明显低于限速时，才认为链路已经饱和，
+        把限速降到观测值附近（不低于配置值的 FLOOR 倍），避免更多上传挤进来互相拖慢；
+        单台机器人网络差只会让总吞吐量偏低，不会触发降速。接近限速时逐步放开，最多回到配置值
+        """
+        if not self.observe(group) or group.maxRate <= 0 or group.active == 0:
+            return
+        # 全局限速已经跑满时，分组跑不满是被全局限住了，不是链路饱和
+        globalSaturated = self.globalRate > 0 and self.total.observed >= self.globalRate * 0.9
+        stalled = group.active >= 2 and group.active > group.lastActive > 0 and \
+            group.observed <= group.lastObserved * 1.05
+        current = group.bucket.rate
+        if stalled and group.observed < current * 0.6 and not globalSaturated:
+            floor = min(group.maxRate, max(self.minRate * group.active, group.maxRate * self.FLOOR))
+            group.bucket.setRate(max(floor, group.observed * 1.2))
+        elif group.observed > current * 0.9 and current < group.maxRate:
+            group.bucket.setRate(min(group.maxRate, current * 1.1))
+        group.lastActive = group.active
+        group.lastObserved = group.observed
+        self.cond.notify_all()
+
+    def observe(self, group: Group):
+        """
+        统计窗口结束时更新观测吞吐量，返回是否更新
+        """
+        now = time.monotonic()
+        elapsed = now - group.windowStart
+        if elapsed < self.adaptInterval:
+            return False
+        rate = group.sentBytes / elapsed
+        group.observed = rate if group.observed == 0 else group.observed * 0.5 + rate * 0.5
+        group.sentBytes = 0
+        group.windowStart = now
+        return True
+
+    def stats(self):
+        with self.cond:
+            return {key: {"active": g.active, "rate": g.bucket.rate, "observed": g.observed}
+                    for key, g in self.groups.items()}
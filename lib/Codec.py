@@ -0,0 +1,118 @@
+import json
+from collections.abc import Mapping
+
+from init import printLog
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class StdJsonCodec:
+    name = "json"
+
+    @staticmethod
+    def loads(data):
+        if isinstance(data, memoryview):
+            data = str(data, "utf-8")
+        return json.loads(data)
+
+    @staticmethod
+    def dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
+
+class OrjsonCodec:
+    """
+    orjson 可以直接解析 memoryview，速度比标准库快数倍
+    """
+    name = "orjson"
+
+    @staticmethod
+    def loads(data):
+        return orjson.loads(data)
+
+    @staticmethod
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+
+CODECS = {StdJsonCodec.name: StdJsonCodec}
+if orjson is not None:
+    CODECS[OrjsonCodec.name] = OrjsonCodec
+
+__codec__ = CODECS.get("orjson", StdJsonCodec)
+
+
+def getCodec():
+    return __codec__
+
+
+def setCodec(name):
+    """
+    切换 JSON 编解码器，orjson 未安装时回退到标准库
+    """
+    global __codec__
+    __codec__ = CODECS.get(name, StdJsonCodec)
+    return __codec__
+
+
+class LazyJson(Mapping):
+    """
+    延迟解析的 JSON 对象，第一次访问时才解析
+    数据区为空时当作空字典；解析失败时记录日志，每次访问都抛出 ValueError
+    解析结果不是对象（如 null、数组）时 value 为原值，按字典访问会抛出 TypeError
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.obj = None
+        self.parsed = False
+        self.error: ValueError = None
+
+    @property
+    def value(self):
+        if not self.parsed:
+            self.parsed = True
+            data, self.data = self.data, None
+            if data is None or len(data) == 0:
+                self.obj = {}
+            else:
+                try:
+                    self.obj = __codec__.loads(data)
+                except Exception as e:
+                    printLog("JSON 解析失败:", e)
+                    self.error = ValueError(f"JSON 解析失败: {e}")
+        if self.error is not None:
+            raise self.error
+        return self.obj
+
+    def mapping(self):
+        value = self.value
+        if not isinstance(value, dict):
+            raise TypeError(f"JSON 不是对象: {value!r}")
+        return value
+
+    def __getitem__(self, key):
+        return self.mapping()[key]
+
+    def __iter__(self):
+        return iter(self.mapping())
+
+    def __len__(self):
+        return len(self.mapping())
+
+    def __contains__(self, key):
+        return key in self.mapping()
+
+    def __eq__(self, other):
+        if isinstance(other, LazyJson):
+            other = other.value
+        return self.value == other
+
+    def __repr__(self):
+        try:
+            return repr(self.value)
+        except ValueError as e:
+            return f"<LazyJson {e}>"
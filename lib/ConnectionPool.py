@@ -0,0 +1,139 @@
+import select
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+from lib.RBKUtils import RBKUtils
+
+
+class ConnectionPool:
+    """
+    按 (ip, port) 缓存的 TCP 连接池，进程内所有工具共用
+    空闲连接超过 idleTimeout 秒后关闭，每台机器人同一端口最多 maxPerRobot 个连接
+    """
+
+    def __init__(self, maxPerRobot=2, idleTimeout=60, connectTimeout=10, timeout=60):
+        self.maxPerRobot = maxPerRobot
+        self.idleTimeout = idleTimeout
+        self.connectTimeout = connectTimeout
+        self.timeout = timeout
+        self.idle = {}  # (ip, port) -> [(socket, 归还时间), ...]
+        self.count = {}  # (ip, port) -> 已打开的连接数（含借出的）
+        self.cond = threading.Condition()
+
+    @staticmethod
+    def isAlive(so: socket.socket):
+        """
+        空闲连接上不应该有可读数据，可读说明对端已关闭或者残留了旧的响应
+        """
+        try:
+            readable, _, _ = select.select([so], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not readable
+
+    def purge(self):
+        """
+        关闭超时的空闲连接，调用时需持有 self.cond
+        """
+        now = time.monotonic()
+        for key in list(self.idle.keys()):
+            keep = []
+            for so, t in self.idle[key]:
+                if now - t < self.idleTimeout:
+                    keep.append((so, t))
+                else:
+                    self.close(key, so)
+            if keep:
+                self.idle[key] = keep
+            else:
+                del self.idle[key]
+
+    def close(self, key, so: socket.socket):
+        try:
+            so.close()
+        except OSError:
+            pass
+        self.count[key] = self.count.get(key, 1) - 1
+        if self.count[key] <= 0:
+            del self.count[key]
+        self.cond.notify_all()
+
+    def acquire(self, ip, port, wait=None):
+        """
+        借出一个连接，优先复用空闲连接，超过上限时最多等待 wait 秒
+        """
+        key = (ip, port)
+        wait = self.connectTimeout if wait is None else wait
+        deadline = time.monotonic() + wait
+        with self.cond:
+            while True:
+                self.purge()
+                idle = self.idle.get(key, [])
+                while idle:
+                    so, _ = idle.pop()
+                    if self.isAlive(so):
+                        so.settimeout(self.timeout)
+                        return so
+                    self.close(key, so)
+                if self.count.get(key, 0) < self.maxPerRobot:
+                    self.count[key] = self.count.get(key, 0) + 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.cond.wait(remaining):
+                    raise TimeoutError(f"等待连接 {ip}:{port} 超时")
+        try:
+            start = time.perf_counter()
+            so = socket.create_connection(key, self.connectTimeout)
+            if RBKUtils.instrument is not None:
+                RBKUtils.instrument.recordConnect(ip, port, time.perf_counter() - start)
+            so.settimeout(self.timeout)
+        except Exception:
+            with self.cond:
+                self.count[key] -= 1
+                if self.count[key] <= 0:
+                    del self.count[key]
+                self.cond.notify_all()
+            raise
+        return so
+
+    def release(self, ip, port, so: socket.socket, reuse=True):
+        """
+        归还连接，reuse 为 False 时直接关闭
+        """
+        key = (ip, port)
+        with self.cond:
+            if reuse and self.isAlive(so):
+                self.idle.setdefault(key, []).append((so, time.monotonic()))
+                self.cond.notify_all()
+            else:
+                self.close(key, so)
+            self.purge()
+
+    @contextmanager
+    def connection(self, ip, port, reuse=True):
+        """
+        with pool.connection(ip, port) as so: ...
+        出现异常时连接状态未知，直接关闭不再复用
+        """
+        so = self.acquire(ip, port)
+        try:
+            yield so
+        except BaseException:
+            self.release(ip, port, so, False)
+            raise
+        self.release(ip, port, so, reuse)
+
+    def clear(self):
+        """
+        关闭所有空闲连接
+        """
+        with self.cond:
+            for key, idle in self.idle.items():
+                for so, _ in idle:
+                    self.close(key, so)
+            self.idle.clear()
+
+
+pool = ConnectionPool()
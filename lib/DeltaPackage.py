@@ -0,0 +1,142 @@
+import json
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import zipfile
+
+from lib.PackageCatalog import MANIFEST_NAMES, isInstalled
+
+DELTA_DIR = ".delta"
+DELTA_MANIFEST = "delta.json"
+
+
+def memberKey(info: zipfile.ZipInfo):
+    return info.CRC, info.file_size
+
+
+def diffPackages(baseline, target):
+    """
+    逐个成员比较两个升级包（按 CRC32 和大小），返回 (变化或新增的成员, 删除的成员名)
+    """
+    with zipfile.ZipFile(baseline) as zb:
+        base = {i.filename: memberKey(i) for i in zb.infolist() if not i.is_dir()}
+    changed = []
+    with zipfile.ZipFile(target) as zt:
+        names = set()
+        for info in zt.infolist():
+            if info.is_dir():
+                continue
+            names.add(info.filename)
+            if base.get(info.filename) != memberKey(info) or \
+                    os.path.basename(info.filename).lower() in MANIFEST_NAMES:
+                changed.append(info.filename)
+    deleted = sorted(set(base) - names)
+    return changed, deleted
+
+
+def buildDelta(baseline, target, outPath, baselineInfo=None, targetInfo=None):
+    """
+    生成只包含变化成员的升级包，清单文件总是保留
+    包内附带 delta.json，记录基准版本、目标版本和删除的成员
+    返回 {"changed": n, "deleted": n, "size": 字节数}
+    """
+    changed, deleted = diffPackages(baseline, target)
+    # 每次生成使用独立的临时文件，完成后再改名
+    fd, tmp = tempfile.mkstemp(".tmp", os.path.basename(outPath) + ".", os.path.dirname(outPath) or ".")
+    os.close(fd)
+    try:
+        writeDelta(baseline, target, tmp, changed, deleted, baselineInfo, targetInfo)
+        # mkstemp 创建的文件只有所有者可读，改为与目标升级包相同的权限
+        os.chmod(tmp, stat.S_IMODE(os.stat(target).st_mode))
+        os.replace(tmp, outPath)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return {"changed": len(changed), "deleted": len(deleted), "size": os.path.getsize(outPath)}
+
+
+def writeDelta(baseline, target, tmp, changed, deleted, baselineInfo, targetInfo):
+    with zipfile.ZipFile(target) as zt, zipfile.ZipFile(tmp, "w") as zo:
+        for name in changed:
+            info = zt.getinfo(name)
+            out = zipfile.ZipInfo(info.filename, info.date_time)
+            out.compress_type = info.compress_type
+            out.external_attr = info.external_attr
+            with zt.open(info) as src, zo.open(out, "w", force_zip64=info.file_size > zipfile.ZIP64_LIMIT) as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+        zo.writestr(DELTA_MANIFEST, json.dumps({
+            "baseline": os.path.basename(baseline),
+            "baselineVersion": (baselineInfo or {}).get("version", ""),
+            "target": os.path.basename(target),
+            "targetVersion": (targetInfo or {}).get("version", ""),
+            "deleted": deleted
+        }, ensure_ascii=False, indent=1))
+
+
+class DeltaCache:
+    """
+    增量包缓存，位于升级包目录下的 .delta，按 (基准包, 目标包) 的 SHA-256 命名
+    同一对包只生成一次，多个线程同时请求时其余线程等待
+    每个目录只应有一个实例，通过 deltaCache(directory) 获取
+    """
+
+    def __init__(self, directory):
+        self.directory = os.path.join(directory, DELTA_DIR)
+        self.lock = threading.Lock()
+        self.building = {}  # 文件名 -> Lock
+
+    def path(self, baselineInfo, targetInfo):
+        return os.path.join(self.directory, f"{baselineInfo['sha256'][:16]}-{targetInfo['sha256'][:16]}.zip")
+
+    def get(self, baselineInfo, targetInfo):
+        """
+        返回增量包路径，不存在时生成
+        """
+        path = self.path(baselineInfo, targetInfo)
+        with self.lock:
+            lock = self.building.setdefault(path, threading.Lock())
+        with lock:
+            if not os.path.exists(path):
+                os.makedirs(self.directory, exist_ok=True)
+                buildDelta(baselineInfo["path"], targetInfo["path"], path, baselineInfo, targetInfo)
+        return path
+
+    def choose(self, targetInfo, installed, entries):
+        """
+        按机器人当前版本选择最小的可用升级包，返回 (路径, 基准包信息或 None)
+        只有基准包清单中的每个组件版本都与机器人上报的版本完全一致（isInstalled，不使用从文件名识别的版本），
+        且 SRC 类型相同时，才使用对应的增量包
+        """
+        best, bestSize, baseline = targetInfo["path"], targetInfo["size"], None
+        for e in entries:
+            if e["sha256"] == targetInfo["sha256"] or e.get("error"):
+                continue
+            if e.get("srcType") and targetInfo.get("srcType") and e["srcType"] != targetInfo["srcType"]:
+                continue
+            if not isInstalled(e, installed):
+                continue
+            path = self.get(e, targetInfo)
+            size = os.path.getsize(path)
+            if size < bestSize:
+                best, bestSize, baseline = path, size, e
+        return best, baseline
+
+
+__deltaCaches__ = {}
+__deltaCachesLock__ = threading.Lock()
+
+
+def deltaCache(directory) -> DeltaCache:
+    """
+    返回升级包目录共用的 DeltaCache，所有上传线程共用同一组生成锁
+    """
+    directory = os.path.abspath(directory)
+    with __deltaCachesLock__:
+        if directory not in __deltaCaches__:
+            __deltaCaches__[directory] = DeltaCache(directory)
+        return __deltaCaches__[directory]
@@ -0,0 +1,65 @@
+from lib.RBKUtils import RBKUtils, HEADER_SIZE
+
+SYNC_BYTES = b'\x5A\x01'
+
+
+class FrameDecoder:
+    """
+    流式报文解析，可以喂入任意大小的数据块
+    用 bytes.find 查找 0x5A 0x01 同步头，丢弃同步头之前的无效数据
+
+        decoder = FrameDecoder()
+        for header, jsonData, data in decoder.feed(so.recv(65536)):
+            ...
+    """
+
+    def __init__(self, maxBodySize=1 << 30):
+        self.maxBodySize = maxBodySize
+        self.buffer = bytearray()
+        self.discarded = 0  # 重新同步时丢弃的字节数
+
+    def feed(self, chunk):
+        """
+        追加数据，返回已经完整的报文 [(header, jsonData, data), ...]
+        jsonData 和 data 是报文体上的 memoryview
+        """
+        self.buffer += chunk
+        frames = []
+        buf = self.buffer
+        while True:
+            start = buf.find(SYNC_BYTES)
+            if start < 0:
+                # 最后一个字节可能是下一个同步头的前半部分
+                keep = 1 if buf[-1:] == SYNC_BYTES[:1] else 0
+                self.discard(len(buf) - keep)
+                break
+            if start > 0:
+                self.discard(start)
+            if len(buf) < HEADER_SIZE:
+                break
+            header = RBKUtils.unpack(buf[:HEADER_SIZE])
+            if header[3] > self.maxBodySize:
+                # 长度不合理，说明不是真正的同步头
+                self.discard(1)
+                continue
+            end = HEADER_SIZE + header[3]
+            if len(buf) < end:
+                break
+            # 只复制一次报文体；视图释放后缓冲区才能缩短
+            with memoryview(buf) as view:
+                body = memoryview(bytes(view[HEADER_SIZE:end]))
+            del buf[:end]
+            jsonLen = min(header[6], header[3])
+            frames.append((header, body[:jsonLen], body[jsonLen:]))
+        return frames
+
+    def discard(self, n):
+        if n > 0:
+            del self.buffer[:n]
+            self.discarded += n
+
+    def pending(self):
+        """
+        缓冲区中尚未组成完整报文的字节数
+        """
+        return len(self.buffer)
@@ -0,0 +1,57 @@
+import ipaddress
+import os
+import re
+
+
+def expandTarget(token):
+    """
+    展开一个目标：单个 IP、CIDR (192.168.1.0/24) 或范围 (192.168.1.10-20 / 192.168.1.10-192.168.1.20)
+    """
+    token = token.strip()
+    if not token:
+        return []
+    if "/" in token:
+        net = ipaddress.ip_network(token, strict=False)
+        hosts = list(net.hosts())
+        return [str(ip) for ip in (hosts if hosts else [net.network_address])]
+    if "-" in token:
+        first, last = token.split("-", 1)
+        first = ipaddress.ip_address(first.strip())
+        last = last.strip()
+        if "." not in last:
+            last = ".".join(str(first).split(".")[:3] + [last])
+        last = ipaddress.ip_address(last)
+        if last < first:
+            raise ValueError(f"无效的 IP 范围 {token}")
+        return [str(first + i) for i in range(int(last) - int(first) + 1)]
+    return [str(ipaddress.ip_address(token))]
+
+
+def parseTargets(text):
+    """
+    解析 IP 列表，以空白、逗号或分号分隔，支持 IP、CIDR、范围，
+    以及 @文件路径（文件中每行一个目标），# 到行尾为注释
+    返回去重后的 IP 列表，顺序不变
+    """
+    ips = []
+    seen = set()
+    text = "\n".join(line.split("#", 1)[0] for line in text.splitlines())
+    for token in re.split(r"[\s,;]+", text):
+        if not token:
+            continue
+        if token.startswith("@"):
+            expanded = loadTargetsFile(token[1:])
+        else:
+            expanded = expandTarget(token)
+        for ip in expanded:
+            if ip not in seen:
+                seen.add(ip)
+                ips.append(ip)
+    return ips
+
+
+def loadTargetsFile(path):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"文件不存在 {path}")
+    with open(path, "r", encoding="utf-8") as f:
+        return parseTargets(f.read())
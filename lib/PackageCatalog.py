@@ -0,0 +1,271 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import zipfile
+
+CATALOG_FILE = ".catalog.json"
+CATALOG_VERSION = 2
+
+VERSION_RE = re.compile(r"(\d+\.\d+\.\d+(?:\.\d+)?)")
+SRC_RE = re.compile(r"SRC[-_]?(\d+(?:\.\d+)?)", re.IGNORECASE)
+MANIFEST_NAMES = ("manifest.json", "version.json", "package.json", "upgrade.json", "info.json")
+COMPONENT_ALIASES = {
+    "rbk": "robokit",
+    "rbkversion": "robokit",
+    "version": "robokit",
+    "robodversion": "robod",
+    "x86patch": "patch",
+    "armpatch": "patch",
+    "dspversion": "dsp",
+    "gyroversion": "gyro"
+}
+
+
+def sha256File(path, blockSize=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            b = f.read(blockSize)
+            if not b:
+                break
+            h.update(b)
+    return h.hexdigest()
+
+
+def normalizeSrc(s):
+    """
+    SRC2000 / src-2000 / [SRC-2000] -> SRC-2000
+    """
+    m = SRC_RE.search(s or "")
+    return f"SRC-{m.group(1)}" if m else ""
+
+
+def readManifest(zf: zipfile.ZipFile):
+    """
+    读取包内的清单文件（manifest.json / version.json 等），没有则返回 {}
+    """
+    for info in zf.infolist():
+        name = info.filename.replace("\\", "/")
+        if name.count("/") > 1 or os.path.basename(name).lower() not in MANIFEST_NAMES:
+            continue
+        if info.file_size > 1 << 20:
+            continue
+        try:
+            js = json.loads(zf.read(info))
+        except Exception:
+            continue
+        if isinstance(js, dict):
+            return js
+    return {}
+
+
+def extractMetadata(path):
+    """
+    从升级包中提取版本、SRC 类型和各组件版本
+    优先使用包内清单，其次从包内文件名和包名中识别
+    """
+    # manifestComponents 只来自包内清单，用于判断是否已安装；components 还包含从文件名识别的版本，只用于显示和搜索
+    meta = {"version": "", "srcType": "", "components": {}, "manifestComponents": {}, "members": 0}
+    name = os.path.basename(path)
+    try:
+        with zipfile.ZipFile(path) as zf:
+            names = zf.namelist()
+            meta["members"] = len(names)
+            manifest = readManifest(zf)
+    except (zipfile.BadZipFile, OSError) as e:
+        meta["error"] = str(e)
+        return meta
+
+    for key in ("version", "Version", "VERSION"):
+        if manifest.get(key):
+            meta["version"] = str(manifest[key])
+            break
+    for key in ("srcType", "SRCType", "srcName", "target", "src"):
+        if manifest.get(key):
+            meta["srcType"] = normalizeSrc(str(manifest[key])) or str(manifest[key])
+            break
+    components = manifest.get("components") or manifest.get("VERSION_LIST") or {}
+    if isinstance(components, dict):
+        meta["manifestComponents"] = {str(k): str(v) for k, v in components.items() if v}
+        meta["components"] = dict(meta["manifestComponents"])
+
+    # 包内顶层目录或文件名形如 robokit-3.4.6.18、robod_5.1.0
+    for member in names:
+        top = member.replace("\\", "/").split("/")[0]
+        m = re.match(r"([A-Za-z][\w\-]*?)[-_]v?" + VERSION_RE.pattern, top)
+        if m and m.group(1) not in meta["components"]:
+            meta["components"][m.group(1)] = m.group(2)
+        if not meta["srcType"]:
+            meta["srcType"] = normalizeSrc(top)
+
+    if not meta["version"]:
+        m = VERSION_RE.search(name)
+        if m:
+            meta["version"] = m.group(1)
+    if not meta["srcType"]:
+        meta["srcType"] = normalizeSrc(name)
+    return meta
+
+
+class PackageCatalog:
+    """
+    升级包目录的索引，保存大小、修改时间、SHA-256 和版本信息
+    缓存在目录下的 .catalog.json，大小和修改时间不变的文件不重新计算
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.cachePath = os.path.join(directory, CATALOG_FILE)
+        self.entries = {}  # 文件名 -> 信息
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.cachePath, "r", encoding="utf-8") as f:
+                js = json.load(f)
+            if js.get("version") == CATALOG_VERSION:
+                self.entries = js.get("entries", {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        tmp = self.cachePath + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": CATALOG_VERSION, "entries": self.entries}, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.cachePath)
+        except OSError:
+            pass
+
+    def refresh(self, onProgress=None):
+        """
+        扫描目录，只对新增或修改过的文件计算哈希和提取信息
+        onProgress(name) 在处理每个需要重新计算的文件前调用
+        返回按文件名排序的条目列表
+        """
+        with self.lock:
+            if not os.path.exists(self.directory):
+                os.makedirs(self.directory)
+            entries = {}
+            changed = False
+            for entry in os.scandir(self.directory):
+                if not entry.is_file() or not entry.name.lower().endswith(".zip"):
+                    continue
+                st = entry.stat()
+                old = self.entries.get(entry.name)
+                if old and old.get("size") == st.st_size and old.get("mtime") == st.st_mtime:
+                    old["path"] = entry.path
+                    entries[entry.name] = old
+                    continue
+                if onProgress is not None:
+                    onProgress(entry.name)
+                info = {
+                    "name": entry.name,
+                    "path": entry.path,
+                    "size": st.st_size,
+                    "mtime": st.st_mtime,
+                    "sha256": sha256File(entry.path)
+                }
+                info.update(extractMetadata(entry.path))
+                entries[entry.name] = info
+                changed = True
+            if changed or entries.keys() != self.entries.keys():
+                self.entries = entries
+                self.save()
+            self.entries = entries
+            return self.list()
+
+    def list(self):
+        return [self.entries[k] for k in sorted(self.entries)]
+
+    def get(self, path):
+        return self.entries.get(os.path.basename(path))
+
+    def search(self, text="", srcType=""):
+        """
+        按版本、SRC 类型或文件名搜索，text 中多个关键字都要匹配
+        """
+        words = text.lower().split()
+        src = normalizeSrc(srcType) if srcType else ""
+        res = []
+        for e in self.list():
+            if src and e.get("srcType") and e["srcType"] != src:
+                continue
+            haystack = " ".join([e["name"], e.get("version", ""), e.get("srcType", "")] +
+                                [f"{k}-{v}" for k, v in e.get("components", {}).items()]).lower()
+            if all(w in haystack for w in words):
+                res.append(e)
+        return res
+
+    def duplicates(self):
+        """
+        返回 {sha256: [文件名, ...]}，只包含内容重复的包
+        """
+        groups = {}
+        for e in self.list():
+            groups.setdefault(e["sha256"], []).append(e["name"])
+        return {k: v for k, v in groups.items() if len(v) > 1}
+
+
+def componentKey(name):
+    """
+    RoboKit / robokit / rbk -> robokit，x86-patch / arm-patch -> patch
+    """
+    key = re.sub(r"[^a-z0-9]", "", str(name).lower())
+    return COMPONENT_ALIASES.get(key, key)
+
+
+def installedVersions(statusInfo, robodInfo=None):
+    """
+    从 1000（机器人信息）和 5041（Robod 版本）的响应中整理出 {组件: 版本}
+    """
+    versions = {}
+    if statusInfo:
+        for k in ("version", "dsp_version", "gyro_version"):
+            if statusInfo.get(k):
+                versions[componentKey(k)] = str(statusInfo[k])
+        for k, v in (statusInfo.get("VERSION_LIST") or {}).items():
+            if isinstance(v, dict):
+                v = v.get("version", "")
+            if v:
+                versions.setdefault(componentKey(k), str(v))
+    if robodInfo and robodInfo.get("version"):
+        versions["robod"] = str(robodInfo["version"])
+    return versions
+
+
+def normalizeVersion(v):
+    """
+    v3.4.6.18 / 3.4.6.18 -> 3.4.6.18，不区分大小写
+    """
+    v = str(v).strip().lower()
+    return v[1:] if re.match(r"v\d", v) else v
+
+
+def versionMatches(expected, actual):
+    """
+    完整版本一致才算一致：3.4.6 与 3.4.6.18 不一致，f103-1.5.2 与 m40-1.5.2 不一致
+    """
+    e, a = normalizeVersion(expected), normalizeVersion(actual)
+    return bool(e) and e == a
+
+
+def isInstalled(meta, installed):
+    """
+    判断升级包是否已经装在机器人上，无法确定时返回 False
+    只使用包内清单中的组件版本，每个组件都要与机器人上报的版本完全一致；
+    没有清单组件的包（版本只能从文件名识别）总是返回 False
+    """
+    if not meta or meta.get("error"):
+        return False
+    components = meta.get("manifestComponents") or {}
+    if not components:
+        return False
+    for k, v in components.items():
+        key = componentKey(k)
+        if key not in installed or not versionMatches(v, installed[key]):
+            return False
+    return True
@@ -0,0 +1,80 @@
+import mmap
+import os
+import threading
+from contextlib import contextmanager
+
+
+class PackageBuffer:
+    """
+    一个升级包文件的只读内存映射，view 为整个文件上的 memoryview
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        st = os.fstat(self.file.fileno())
+        self.key = (path, st.st_size, st.st_mtime_ns)
+        self.size = st.st_size
+        self.refs = 0
+        if self.size > 0:
+            self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.view = memoryview(self.mmap)
+        else:
+            self.mmap = None
+            self.view = memoryview(b"")
+
+    def close(self):
+        self.view.release()
+        if self.mmap is not None:
+            self.mmap.close()
+        self.file.close()
+
+
+class PackageStore:
+    """
+    升级包共享存储，同一个文件只映射一次，所有并发上传共用同一块只读内存
+    按引用计数管理，最后一个上传结束后解除映射；文件被修改（大小或修改时间变化）后重新映射
+
+        with store.open(path) as buf:
+            RBKUtils.requestView(so, 5136, js, buf.view)
+    """
+
+    def __init__(self):
+        self.buffers = {}  # 路径 -> PackageBuffer
+        self.lock = threading.Lock()
+
+    def acquire(self, path) -> PackageBuffer:
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        with self.lock:
+            buf = self.buffers.get(path)
+            if buf is None or buf.key != (path, st.st_size, st.st_mtime_ns):
+                # 旧的映射由仍在使用它的上传释放
+                buf = PackageBuffer(path)
+                self.buffers[path] = buf
+            buf.refs += 1
+            return buf
+
+    def release(self, buf: PackageBuffer):
+        with self.lock:
+            buf.refs -= 1
+            if buf.refs > 0:
+                return
+            if self.buffers.get(buf.path) is buf:
+                del self.buffers[buf.path]
+        buf.close()
+
+    @contextmanager
+    def open(self, path):
+        buf = self.acquire(path)
+        try:
+            yield buf
+        finally:
+            self.release(buf)
+
+    def stats(self):
+        with self.lock:
+            return {path: {"size": buf.size, "refs": buf.refs} for path, buf in self.buffers.items()}
+
+
+store = PackageStore()
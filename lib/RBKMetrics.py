@@ -0,0 +1,126 @@
+import json
+import threading
+import time
+
+SUB_BUCKET_BITS = 5
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+
+
+class Histogram:
+    """
+    HDR 风格的对数-线性直方图，每个 2 的幂区间分为 32 个桶，相对误差约 3%
+    只记录非负整数，桶用字典稀疏保存
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    @staticmethod
+    def bucketIndex(value):
+        if value < SUB_BUCKET_COUNT:
+            return value
+        shift = value.bit_length() - SUB_BUCKET_BITS - 1
+        return SUB_BUCKET_COUNT * (shift + 1) + (value >> shift) - SUB_BUCKET_COUNT
+
+    @staticmethod
+    def bucketValue(index):
+        """
+        桶的下界
+        """
+        if index < SUB_BUCKET_COUNT:
+            return index
+        shift = index // SUB_BUCKET_COUNT - 1
+        return (index % SUB_BUCKET_COUNT + SUB_BUCKET_COUNT) << shift
+
+    def record(self, value):
+        value = max(0, int(value))
+        index = Histogram.bucketIndex(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, q):
+        if self.count == 0:
+            return 0
+        target = max(1, int(q * self.count + 0.5))
+        n = 0
+        for index in sorted(self.counts):
+            n += self.counts[index]
+            if n >= target:
+                return min(Histogram.bucketValue(index), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+    def toDict(self):
+        return {
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.mean(),
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99)
+        }
+
+
+class RBKMetrics:
+    """
+    按 (IP, API 编号) 统计连接耗时、首字节时间、总耗时和收发字节数
+    时间单位为微秒
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}  # (ip, number) -> {名称: Histogram}
+
+    def histogramsOf(self, ip, number):
+        key = (ip, number)
+        if key not in self.histograms:
+            self.histograms[key] = {}
+        return self.histograms[key]
+
+    def add(self, ip, number, **values):
+        with self.lock:
+            hs = self.histogramsOf(ip, number)
+            for name, value in values.items():
+                if name not in hs:
+                    hs[name] = Histogram()
+                hs[name].record(value)
+
+    def recordConnect(self, ip, port, seconds):
+        self.add(ip, f"connect:{port}", connect_us=seconds * 1e6)
+
+    def record(self, ip, number, ttfb, latency, requestBytes, responseBytes):
+        self.add(ip, number, ttfb_us=ttfb * 1e6, latency_us=latency * 1e6,
+                 request_bytes=requestBytes, response_bytes=responseBytes)
+
+    def snapshot(self, ip=None, number=None):
+        """
+        返回统计结果 {ip: {API 编号: {名称: 统计}}}，可以按 ip 和编号过滤
+        """
+        res = {}
+        with self.lock:
+            for (i, n), hs in self.histograms.items():
+                if ip is not None and i != ip or number is not None and n != number:
+                    continue
+                res.setdefault(i, {})[str(n)] = {name: h.toDict() for name, h in hs.items()}
+        return res
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump({"time": time.strftime("%Y-%m-%d %H:%M:%S"), "metrics": self.snapshot()}, f, indent=2)
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+
+
+metrics = RBKMetrics()
@@ -0,0 +1,243 @@
+"""
+本地模拟 RBK 机器人，用于离线测试和压力测试
+
+    python -m lib.RBKSimulator --ip 127.0.1.1 --count 1000 --latency 0.02
+
+每台模拟机器人在自己的 IP 上监听 19204 和 19208，Linux 下 127.0.0.0/8 整段都可直接使用
+"""
+import argparse
+import asyncio
+import ipaddress
+import json
+import random
+import time
+
+from lib.RBKUtils import RBKUtils, HEADER_SIZE
+
+
+class SimulatorConfig:
+    def __init__(self):
+        self.latency = 0.0  # 每个响应的延时（秒）
+        self.bandwidth = 0  # 收发带宽（字节/秒），0 为不限速
+        self.payloadSize = 0  # 1000/1999 响应附加的数据大小（字节）
+        self.errorRate = 0.0  # 返回错误响应的概率
+        self.dropRate = 0.0  # 直接断开连接的概率
+        self.upgradeStepDelay = 0.1  # 升级时每个阶段的耗时（秒）
+        self.rbkVersion = "3.4.6.18"
+        self.robodVersion = "5.1.0"
+        self.srcName = "[SRC-2000]"
+        self.dspVersion = "v1.6.3"
+        self.gyroVersion = "v2.0.1"
+        self.patchVersion = "20240101"
+
+
+class SimulatedRobot:
+    def __init__(self, ip, config: SimulatorConfig, index=0):
+        self.ip = ip
+        self.config = config
+        self.robotID = f"SIM-{index:05d}"
+        self.servers = []
+        self.upgradeCount = 0
+        self.activeCount = 0
+
+    async def start(self, ports=(19204, 19208)):
+        for port in ports:
+            self.servers.append(await asyncio.start_server(self.handle, self.ip, port))
+
+    async def stop(self):
+        for server in self.servers:
+            server.close()
+            await server.wait_closed()
+        self.servers.clear()
+
+    async def throttle(self, size):
+        if self.config.bandwidth > 0 and size > 0:
+            await asyncio.sleep(size / self.config.bandwidth)
+
+    async def readBody(self, reader: asyncio.StreamReader, size):
+        """
+        按带宽限制读取报文体
+        """
+        if self.config.bandwidth <= 0:
+            return await reader.readexactly(size)
+        body = bytearray()
+        chunk = max(1024, self.config.bandwidth // 20)
+        while len(body) < size:
+            d = await reader.readexactly(min(chunk, size - len(body)))
+            body += d
+            await self.throttle(len(d))
+        return bytes(body)
+
+    async def write(self, writer: asyncio.StreamWriter, number, id, _json: dict = None, data=None):
+        buffers = RBKUtils.packBuffers(number, _json, data, id)
+        writer.writelines(buffers)
+        await writer.drain()
+        await self.throttle(sum(len(b) for b in buffers))
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                header = RBKUtils.unpack(await reader.readexactly(HEADER_SIZE))
+                body = await self.readBody(reader, header[3])
+                js = {}
+                if header[6] > 0:
+                    js = json.loads(body[:header[6]])
+                data = body[header[6]:]
+                if random.random() < self.config.dropRate:
+                    break
+                if self.config.latency > 0:
+                    await asyncio.sleep(self.config.latency)
+                await self.dispatch(writer, header[4], header[2], js, data)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, writer: asyncio.StreamWriter, number, id, js: dict, data: bytes):
+        c = self.config
+        if random.random() < c.errorRate:
+            await self.write(writer, number + 10000, id, None,
+                             json.dumps({"ret_code": 1, "err_msg": "simulated error"}).encode())
+            return
+        if number == 5136 and js.get("type") == "upgradeSRC" or number == 5104:
+            await self.upgrade(writer, number, id, js, data)
+            return
+        if number == 5136 and js.get("type") == "activeRobot" or number == 5106:
+            self.activeCount += 1
+            await self.write(writer, number + 10000, id, js if number == 5136 else None, None)
+            return
+        res = self.response(number, js)
+        if res is None:
+            res = {"ret_code": 1, "err_msg": f"unsupported api {number}"}
+        await self.write(writer, number + 10000, id, None, json.dumps(res).encode())
+
+    def rbkStatus(self):
+        return {"status": "running", "version": self.config.rbkVersion, "is_running": True, "count": 3,
+                "mem": 512.5, "cpu": 35.2, "cpu_num": 4, "cpu_temp": 52.0}
+
+    def padding(self):
+        return "x" * self.config.payloadSize
+
+    def response(self, number, js: dict):
+        c = self.config
+        if number == 1000:
+            res = {
+                "id": self.robotID,
+                "version": c.rbkVersion,
+                "dsp_version": c.dspVersion,
+                "gyro_version": c.gyroVersion,
+                "echoid": f"ECHO-{self.robotID}",
+                "VERSION_LIST": {"x86-patch": c.patchVersion},
+                "features": []
+            }
+            if c.payloadSize:
+                res["padding"] = self.padding()
+            return res
+        if number == 1002:
+            return {"odo": 1234.5, "today_odo": 12.3, "time": 3600000, "total_time": 86400000}
+        if number == 1007:
+            return {"battery_level": 0.86, "battery_temp": 30.5, "charging": False, "voltage": 48.2}
+        if number == 1050:
+            return {"fatals": [], "errors": [], "warnings": [], "notices": []}
+        if number == 1999:
+            res = {"alarms": {"fatals": [], "errors": [], "warnings": [], "notices": []}}
+            if c.payloadSize:
+                res["padding"] = self.padding()
+            return res
+        if number == 5041:
+            return {"version": c.robodVersion, "srcName": c.srcName, "SRCType": 0}
+        if number == 5011:
+            return self.rbkStatus()
+        if number == 5136:
+            t = js.get("type")
+            if t == "getAllNetworkInterfaces":
+                return {"interfaces": [{"name": "eth0", "ip": self.ip, "mac": "00:11:22:33:44:55"}]}
+            if t == "getCpuSerialForRobotID":
+                return {"cpuSerialForRobotID": self.robotID}
+            if t == "getLastImportedParamFileName":
+                return {"fileName": "robot.param"}
+            if t == "getRBKStatus":
+                return self.rbkStatus()
+        return None
+
+    async def upgrade(self, writer: asyncio.StreamWriter, number, id, js: dict, data: bytes):
+        """
+        升级：先应答上传，再推送 15125 进度，最后以 15136/15104 结束
+        """
+        c = self.config
+        self.upgradeCount += 1
+        await self.write(writer, number + 10000, id, js if number == 5136 else None, None)
+        for i in range(10):
+            await asyncio.sleep(c.upgradeStepDelay)
+            await self.write(writer, 15125, 0, None, json.dumps({"upgradeStatus": str(i)}).encode())
+        failed = random.random() < c.errorRate or len(data) == 0
+        if number == 5136:
+            res = {"type": "upgradeSRC"}
+            if failed:
+                res["err_msg"] = "simulated upgrade failure"
+            await self.write(writer, 15136, 0, res, json.dumps({"time": time.time()}).encode())
+        else:
+            await self.write(writer, 15104, 0, None,
+                             json.dumps({"err_msg": "simulated upgrade failure"}).encode() if failed else None)
+
+
+class RBKSimulator:
+    """
+    一组模拟机器人
+    """
+
+    def __init__(self, config: SimulatorConfig = None):
+        self.config = config or SimulatorConfig()
+        self.robots = []
+
+    async def start(self, firstIp="127.0.1.1", count=1, ports=(19204, 19208)):
+        ip = ipaddress.ip_address(firstIp)
+        for i in range(count):
+            robot = SimulatedRobot(str(ip + i), self.config, i)
+            await robot.start(ports)
+            self.robots.append(robot)
+        return [robot.ip for robot in self.robots]
+
+    async def stop(self):
+        for robot in self.robots:
+            await robot.stop()
+        self.robots.clear()
+
+
+async def main(args):
+    config = SimulatorConfig()
+    config.latency = args.latency
+    config.bandwidth = int(args.bandwidth * 1024 * 1024)
+    config.payloadSize = args.payload_size
+    config.errorRate = args.error_rate
+    config.dropRate = args.drop_rate
+    config.upgradeStepDelay = args.upgrade_step_delay
+    config.rbkVersion = args.rbk_version
+    config.robodVersion = args.robod_version
+    config.srcName = args.src_name
+    simulator = RBKSimulator(config)
+    ips = await simulator.start(args.ip, args.count)
+    print(f"模拟机器人 {len(ips)} 台：{ips[0]} ~ {ips[-1]}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await simulator.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="RBK 机器人模拟器")
+    parser.add_argument("--ip", default="127.0.1.1", help="第一台机器人的 IP")
+    parser.add_argument("--count", type=int, default=1, help="机器人数量，IP 依次递增")
+    parser.add_argument("--latency", type=float, default=0.0, help="响应延时（秒）")
+    parser.add_argument("--bandwidth", type=float, default=0.0, help="每个连接的带宽（MB/s），0 为不限速")
+    parser.add_argument("--payload-size", type=int, default=0, help="1000/1999 响应附加的数据大小（字节）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回错误的概率")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="断开连接的概率")
+    parser.add_argument("--upgrade-step-delay", type=float, default=0.1, help="升级每个阶段的耗时（秒）")
+    parser.add_argument("--rbk-version", default="3.4.6.18")
+    parser.add_argument("--robod-version", default="5.1.0")
+    parser.add_argument("--src-name", default="[SRC-2000]")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
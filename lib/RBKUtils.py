@@ -1,63 +1,256 @@
-import json
+import itertools
 import struct
+import threading
+import time
 from socket import socket
 
+from init import printLog
+from lib.Codec import getCodec, LazyJson
+
 PACK_FMT_STR = '!BBHLHHH2s'
+HEADER_SIZE = struct.calcsize(PACK_FMT_STR)
+# 5041 没有 srcName 时按 SRCType 对应的 SRC 类型
+SRC_TYPES = ["[SRC-2000]", "[SRC-3000]", "[SRC-800]", "[SRC-2000.2]", "[SRC-2000.1]"]
+
+__idCounter__ = itertools.count(1)
+__idLock__ = threading.Lock()
 
 
 class RBKUtils:
+    # 性能统计钩子，需要实现 record(ip, number, ttfb, latency, requestBytes, responseBytes)
+    # 和 recordConnect(ip, port, seconds)，例如 lib.RBKMetrics.metrics
+    instrument = None
 
     @staticmethod
-    def pack(number, _json:dict = None, data: bytes = None, id=1):
-        dataLength = 0
-        jsonLength = 0
+    def packHeader(number, jsonLength=0, dataLength=0, id=1):
+        """
+        生成报文头，dataLength 为报文体总长度（含 JSON 部分）
+        """
+        return struct.pack(PACK_FMT_STR, 0x5A, 0x01, id, dataLength, number, number, jsonLength, b'\x00\x00')
 
+    @staticmethod
+    def packBuffers(number, _json: dict = None, data=None, id=1):
+        """
+        返回 [报文头, JSON, 数据] 三段缓冲区，数据区不做拷贝
+        """
         jsData = b''
         if _json is not None:
-            jsData = json.dumps(_json).encode()
-            jsonLength = len(jsData)
-            dataLength = jsonLength
-
+            jsData = getCodec().dumps(_json)
+        dataLength = len(jsData)
         if data is not None:
             dataLength += len(data)
+        else:
+            data = b''
+        return [RBKUtils.packHeader(number, len(jsData), dataLength, id), jsData, data]
 
-        d = struct.pack(PACK_FMT_STR, 0x5A, 0x01, id, dataLength, number, number, jsonLength, b'\x00\x00')
+    @staticmethod
+    def pack(number, _json:dict = None, data: bytes = None, id=1):
+        return b''.join(RBKUtils.packBuffers(number, _json, data, id))
 
-        if jsData is not None:
-            d = d + jsData
+    @staticmethod
+    def unpack(data):
+        return struct.unpack(PACK_FMT_STR, data)
 
-        if data is not None:
-            d = d + data
+    @staticmethod
+    def loads(data):
+        """
+        解析 JSON，data 可以是 bytes/bytearray/memoryview
+        """
+        return getCodec().loads(data)
 
-        return d
+    @staticmethod
+    def srcName(robodInfo):
+        """
+        5041 响应中的 SRC 类型，旧版 Robod 只有 SRCType 时按 SRC_TYPES 转换，都没有时为 [SRC-?]
+        """
+        srcName = robodInfo.get("srcName")
+        if srcName:
+            return srcName
+        srcType = robodInfo.get("SRCType", -1)
+        if isinstance(srcType, int) and 0 <= srcType < len(SRC_TYPES):
+            return SRC_TYPES[srcType]
+        return "[SRC-?]"
 
     @staticmethod
-    def unpack(data):
-        return struct.unpack(PACK_FMT_STR, data)
+    def lazy(data):
+        """
+        返回延迟解析的 JSON，只读取少量字段或可能不读取时使用
+        """
+        return LazyJson(data)
 
     @staticmethod
-    def request(so: socket, number, _json:dict = None, data: bytes = None, id=1):
-        req = RBKUtils.pack(number, _json, data, id)
-        so.sendall(req)
-        # 接收报文头
-        headData = so.recv(16)
-        # 解析报文头
-        header = RBKUtils.unpack(headData)
-        # 获取报文体长度
+    def sendBuffers(so: socket, buffers: list):
+        """
+        分段发送多个缓冲区，支持 sendmsg 时一次系统调用发送多段（Windows 不支持则逐段 sendall）
+        """
+        views = [memoryview(b).cast('B') for b in buffers if len(b) > 0]
+        if not hasattr(so, "sendmsg"):
+            for v in views:
+                so.sendall(v)
+            return
+        while views:
+            n = so.sendmsg(views)
+            while n > 0:
+                if n >= len(views[0]):
+                    n -= len(views[0])
+                    views.pop(0)
+                else:
+                    views[0] = views[0][n:]
+                    n = 0
+
+    @staticmethod
+    def send(so: socket, number, _json: dict = None, data=None, id=1):
+        RBKUtils.sendBuffers(so, RBKUtils.packBuffers(number, _json, data, id))
+
+    @staticmethod
+    def sendView(so: socket, number, _json: dict, view: memoryview, id=1, chunkSize=1 << 20, onProgress=None):
+        """
+        以 view（例如共享的只读内存映射）作为数据区发送报文，按 chunkSize 分块直接从 view 发送，不做拷贝
+        onProgress(sent, total) 在每块发送后调用
+        """
+        total = len(view)
+        header, jsData, _ = RBKUtils.packBuffers(number, _json, None, id)
+        header = RBKUtils.packHeader(number, len(jsData), len(jsData) + total, id)
+        RBKUtils.sendBuffers(so, [header, jsData])
+        sent = 0
+        while sent < total:
+            with view[sent:sent + chunkSize] as chunk:
+                so.sendall(chunk)
+                sent += len(chunk)
+            if onProgress is not None:
+                onProgress(sent, total)
+        return sent
+
+    @staticmethod
+    def requestView(so: socket, number, _json: dict, view: memoryview, id=1, chunkSize=1 << 20, onProgress=None):
+        """
+        与 request 相同，数据区直接从 view 发送
+        """
+        start = time.perf_counter()
+        sent = RBKUtils.sendView(so, number, _json, view, id, chunkSize, onProgress)
+        return RBKUtils.recvResponse(so, number, start, RBKUtils.requestSize(_json, sent))
+
+    @staticmethod
+    def recvInto(so: socket, view: memoryview):
+        """
+        把 view 填满，连接断开时抛出 ConnectionError
+        """
+        while len(view) > 0:
+            n = so.recv_into(view)
+            if n == 0:
+                raise ConnectionError("连接已断开")
+            view = view[n:]
+
+    @staticmethod
+    def recvHeader(so: socket):
+        headData = bytearray(HEADER_SIZE)
+        RBKUtils.recvInto(so, memoryview(headData))
+        return RBKUtils.unpack(headData)
+
+    @staticmethod
+    def recvBody(so: socket, header):
+        """
+        报文体只分配一次，返回报文体上的 (jsonView, dataView)
+        """
         bodyLen = header[3]
-        jsonLen = header[6]
-        readSize = 1024
-        recvData = b''
-        while (bodyLen > 0):
-            recv = so.recv(readSize)
-            recvData += recv
-            bodyLen -= len(recv)
-            if bodyLen < readSize:
-                readSize = bodyLen
-        js = {}
+        jsonLen = min(header[6], bodyLen)
+        body = memoryview(bytearray(bodyLen))
+        RBKUtils.recvInto(so, body)
+        return body[:jsonLen], body[jsonLen:]
+
+    @staticmethod
+    def recvFrame(so: socket):
+        """
+        接收一个完整报文，返回 (header, jsonView, dataView)
+        """
+        header = RBKUtils.recvHeader(so)
+        return (header,) + RBKUtils.recvBody(so, header)
+
+    @staticmethod
+    def peerIp(so: socket):
         try:
-            if jsonLen > 0:
-                js = json.loads(recvData[:jsonLen])
-        except Exception as e:
-            print("Error:", e)
-        return js, recvData[jsonLen:header[3]]
+            return so.getpeername()[0]
+        except (OSError, IndexError, TypeError):
+            return ""
+
+    @staticmethod
+    def nextId():
+        """
+        分配一个报文序号 (1 ~ 65535)
+        """
+        with __idLock__:
+            return (next(__idCounter__) - 1) % 0xFFFF + 1
+
+    @staticmethod
+    def request(so: socket, number, _json:dict = None, data: bytes = None, id=1):
+        if RBKUtils.instrument is not None:
+            return RBKUtils.requestInstrumented(so, number, _json, data, id)
+        RBKUtils.send(so, number, _json, data, id)
+        _, jsonView, dataView = RBKUtils.recvFrame(so)
+        return LazyJson(jsonView), dataView
+
+    @staticmethod
+    def requestInstrumented(so: socket, number, _json: dict = None, data: bytes = None, id=1):
+        """
+        与 request 相同，同时记录首字节时间、总耗时和收发字节数
+        """
+        buffers = RBKUtils.packBuffers(number, _json, data, id)
+        start = time.perf_counter()
+        RBKUtils.sendBuffers(so, buffers)
+        return RBKUtils.recvResponse(so, number, start, sum(len(b) for b in buffers))
+
+    @staticmethod
+    def recvResponse(so: socket, number, start, requestBytes):
+        """
+        接收请求的响应，开启统计时记录从 start 开始的首字节时间、总耗时和收发字节数
+        """
+        instrument = RBKUtils.instrument
+        header = RBKUtils.recvHeader(so)
+        ttfb = time.perf_counter() - start
+        jsonView, dataView = RBKUtils.recvBody(so, header)
+        if instrument is not None:
+            instrument.record(RBKUtils.peerIp(so), number, ttfb, time.perf_counter() - start,
+                              requestBytes, HEADER_SIZE + header[3])
+        return LazyJson(jsonView), dataView
+
+    @staticmethod
+    def requestSize(_json, dataLength):
+        """
+        请求报文的总字节数（报文头 + JSON + 数据区）
+        """
+        return HEADER_SIZE + (len(getCodec().dumps(_json)) if _json is not None else 0) + dataLength
+
+    @staticmethod
+    def pipeline(so: socket, requests: list):
+        """
+        一次发送多个请求后再统一接收，按报文序号把响应对应回请求
+        requests: [(number, json, data), ...]，json 和 data 可以省略
+        返回与 requests 顺序一致的 [(js, data), ...]
+        """
+        ids = []
+        frames = []
+        for req in requests:
+            number, _json, data = (tuple(req) + (None, None))[:3]
+            id = RBKUtils.nextId()
+            while id in ids:
+                id = RBKUtils.nextId()
+            ids.append(id)
+            frames.append(RBKUtils.pack(number, _json, data, id))
+        start = time.perf_counter()
+        so.sendall(b''.join(frames))
+
+        instrument = RBKUtils.instrument
+        results = {}
+        while len(results) < len(ids):
+            header = RBKUtils.recvHeader(so)
+            ttfb = time.perf_counter() - start
+            jsonView, dataView = RBKUtils.recvBody(so, header)
+            if header[2] not in ids or header[2] in results:
+                printLog("Unexpected frame:", header)
+                continue
+            if instrument is not None:
+                i = ids.index(header[2])
+                instrument.record(RBKUtils.peerIp(so), requests[i][0], ttfb, time.perf_counter() - start,
+                                  len(frames[i]), HEADER_SIZE + header[3])
+            results[header[2]] = (LazyJson(jsonView), dataView)
+        return [results[id] for id in ids]
@@ -0,0 +1,111 @@
+import asyncio
+import ipaddress
+import threading
+import time
+
+from lib.AsyncRBKClient import AsyncRBKClient, forEachRobot
+from lib.IPUtils import parseTargets
+from lib.RBKUtils import RBKUtils
+
+CONNECT_TIMEOUT = 0.5  # 局域网内连接 19204 超过这个时间视为没有机器人
+QUERY_TIMEOUT = 3.0
+
+
+async def identify(ip, connectTimeout=CONNECT_TIMEOUT, timeout=QUERY_TIMEOUT):
+    """
+    探测一个 IP：先非阻塞连接 19204，连不上返回 None
+    连上后用 1000 确认是机器人，同时在 19208 查询 5041（Robod 不可用时只缺少 SRC 信息）
+    """
+    status = AsyncRBKClient(ip, 19204, connectTimeout)
+    try:
+        await status.connect()
+    except (OSError, asyncio.TimeoutError):
+        return None
+    status.timeout = timeout
+    try:
+        robod = AsyncRBKClient(ip, 19208, timeout)
+        statusInfo, robodInfo = await asyncio.gather(status.robotStatusInfo(), queryRobod(robod),
+                                                     return_exceptions=True)
+    finally:
+        await status.close()
+    if isinstance(statusInfo, BaseException) or not isinstance(statusInfo, dict):
+        return None
+    if isinstance(robodInfo, BaseException) or not isinstance(robodInfo, dict):
+        robodInfo = {}
+    return {
+        "ip": ip,
+        "id": statusInfo.get("id", ""),
+        "srcName": RBKUtils.srcName(robodInfo) if robodInfo else "",
+        "rbkVersion": statusInfo.get("version", ""),
+        "robodVersion": robodInfo.get("version", ""),
+        "dspVersion": statusInfo.get("dsp_version", ""),
+        "gyroVersion": statusInfo.get("gyro_version", ""),
+        "seen": time.time()
+    }
+
+
+async def queryRobod(client: AsyncRBKClient):
+    async with client:
+        return await client.robodVersionInfo()
+
+
+async def discover(targets, concurrency=512, onFound=None):
+    """
+    扫描 targets（IP 列表，或 parseTargets 支持的文本，如 "192.168.192.0/24"）中的机器人
+    每发现一台调用一次 onFound(info)，返回按 IP 排序的 info 列表
+    concurrency 受进程可打开的文件数限制，过大时连接会失败而漏掉机器人
+    """
+    ips = parseTargets(targets) if isinstance(targets, str) else list(targets)
+
+    async def probe(ip):
+        info = await identify(ip)
+        if info is not None and onFound is not None:
+            onFound(info)
+        return info
+
+    results = await forEachRobot(ips, probe, concurrency)
+    found = [info for info in results.values() if isinstance(info, dict)]
+    return sorted(found, key=lambda info: ipaddress.ip_address(info["ip"]))
+
+
+class RobotRegistry:
+    """
+    已发现的机器人列表，IP -> info，可以在任意线程更新
+    监听者在更新所在的线程被调用，界面需要自己转到主线程
+    """
+
+    def __init__(self):
+        self.robots = {}
+        self.listeners = []
+        self.lock = threading.Lock()
+
+    def update(self, info: dict):
+        with self.lock:
+            self.robots[info["ip"]] = info
+            listeners = list(self.listeners)
+        for fn in listeners:
+            fn(info)
+
+    def remove(self, ip):
+        with self.lock:
+            self.robots.pop(ip, None)
+
+    def list(self):
+        with self.lock:
+            robots = list(self.robots.values())
+        return sorted(robots, key=lambda info: ipaddress.ip_address(info["ip"]))
+
+    def ips(self):
+        return [info["ip"] for info in self.list()]
+
+    def subscribe(self, fn):
+        with self.lock:
+            self.listeners.append(fn)
+
+    def unsubscribe(self, fn):
+        with self.lock:
+            if fn in self.listeners:
+                self.listeners.remove(fn)
+
+
+registry = RobotRegistry()
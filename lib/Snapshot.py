@@ -0,0 +1,75 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from lib.ConnectionPool import pool
+
+
+class SnapshotPart:
+    def __init__(self, name, port):
+        self.name = name
+        self.port = port
+        self.result = None
+        self.error: Exception = None
+        self.elapsed = 0.0  # 连接加查询的耗时（秒）
+
+
+class Snapshot:
+    """
+    一台机器人各个端口同时查询的结果，snapshot[名称] 为该部分查询函数的返回值
+    """
+
+    def __init__(self, ip, parts):
+        self.ip = ip
+        self.parts = {part.name: part for part in parts}
+        self.elapsed = 0.0
+
+    def __getitem__(self, name):
+        return self.parts[name].result
+
+    @property
+    def ok(self):
+        return all(part.error is None for part in self.parts.values())
+
+    def errors(self):
+        return {part.name: part.error for part in self.parts.values() if part.error is not None}
+
+    def timings(self):
+        timings = {name: round(part.elapsed, 3) for name, part in self.parts.items()}
+        timings["total"] = round(self.elapsed, 3)
+        return timings
+
+    def timingText(self):
+        text = " ".join(f"{part.port} {part.elapsed:.3f}s" for part in self.parts.values())
+        return f"{text} 总计 {self.elapsed:.3f}s"
+
+
+def collect(ip, queries: dict) -> Snapshot:
+    """
+    同时连接多个端口查询一台机器人，总耗时约为最慢的一个端口而不是各端口之和
+    queries: {名称: (端口, fn(so))}，fn 在该端口的连接上执行并返回这一部分的结果
+    某个部分失败时记录在 part.error 中，不影响其它部分
+
+        snapshot = collect(ip, {"status": (19204, queryStatus), "robod": (19208, queryRobod)})
+    """
+    parts = [SnapshotPart(name, port) for name, (port, _) in queries.items()]
+    fns = [fn for _, fn in queries.values()]
+
+    def run(part: SnapshotPart, fn):
+        start = time.monotonic()
+        try:
+            with pool.connection(ip, part.port) as so:
+                part.result = fn(so)
+        except Exception as e:
+            part.error = e
+        part.elapsed = time.monotonic() - start
+
+    snapshot = Snapshot(ip, parts)
+    start = time.monotonic()
+    # 第一部分在当前线程执行，其余部分各用一个线程
+    with ThreadPoolExecutor(max_workers=max(1, len(parts) - 1)) as executor:
+        for part, fn in zip(parts[1:], fns[1:]):
+            executor.submit(run, part, fn)
+        if parts:
+            run(parts[0], fns[0])
+    snapshot.elapsed = time.monotonic() - start
+    return snapshot
@@ -0,0 +1,90 @@
+import time
+from collections import deque
+
+MB = 1024 * 1024
+
+
+def formatDuration(seconds):
+    if seconds is None or seconds < 0 or seconds == float("inf"):
+        return "--:--"
+    seconds = int(seconds + 0.5)
+    h, m, s = seconds // 3600, seconds // 60 % 60, seconds % 60
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m:02d}:{s:02d}"
+
+
+def formatTransfer(s: dict):
+    """
+    格式化 TransferMeter.snapshot()
+    """
+    fraction = s["sent"] / s["total"] if s["total"] else 1.0
+    return (f"{s['sent'] / MB:.1f}/{s['total'] / MB:.1f} MB {fraction * 100:.0f}% "
+            f"{s['rate'] / MB:.2f} MB/s (平均 {s['average'] / MB:.2f}) 剩余 {formatDuration(s['eta'])}")
+
+
+class TransferMeter:
+    """
+    上传进度统计：已发送字节、当前速率（最近 window 秒）、平均速率和剩余时间
+    刚开始的数据先进入发送缓冲区，速率虚高，不足 MIN_ELAPSED 秒时不计算速率
+    """
+    MIN_ELAPSED = 0.5
+
+    def __init__(self, total, window=3.0):
+        self.total = total
+        self.window = window
+        self.sent = 0
+        self.start = time.monotonic()
+        self.end = None
+        self.samples = deque([(self.start, 0)])  # (时间, 已发送字节)
+
+    def update(self, sent):
+        now = time.monotonic()
+        self.sent = sent
+        self.samples.append((now, sent))
+        while len(self.samples) > 2 and now - self.samples[1][0] >= self.window:
+            self.samples.popleft()
+        if sent >= self.total:
+            self.end = now
+
+    @property
+    def elapsed(self):
+        return (self.end or time.monotonic()) - self.start
+
+    @property
+    def rate(self):
+        """
+        当前速率（字节/秒）
+        """
+        (t0, s0), (t1, s1) = self.samples[0], self.samples[-1]
+        return (s1 - s0) / (t1 - t0) if t1 - t0 >= self.MIN_ELAPSED else 0.0
+
+    @property
+    def average(self):
+        elapsed = self.elapsed
+        return self.sent / elapsed if elapsed >= self.MIN_ELAPSED else 0.0
+
+    @property
+    def eta(self):
+        """
+        剩余秒数，按当前速率估算，还没有速率时返回 None
+        """
+        rate = self.rate or self.average
+        if self.sent >= self.total:
+            return 0.0
+        return (self.total - self.sent) / rate if rate > 0 else None
+
+    @property
+    def fraction(self):
+        return self.sent / self.total if self.total else 1.0
+
+    def snapshot(self):
+        return {
+            "sent": self.sent,
+            "total": self.total,
+            "rate": self.rate,
+            "average": self.average,
+            "eta": self.eta,
+            "elapsed": self.elapsed
+        }
+
+    def text(self):
+        return formatTransfer(self.snapshot())
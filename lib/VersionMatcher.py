@@ -0,0 +1,148 @@
+import fnmatch
+import re
+
+from lib.PackageCatalog import normalizeSrc
+from lib.VersionSheet import VersionSheet
+
+# 可选的字母数字前缀（如 f103-、m40-）加点分版本号
+VERSION_KEY_RE = re.compile(r"^(?:([A-Za-z][A-Za-z0-9]*?)[-_]?)?(\d+(?:\.\d+)*)$")
+OPERATORS = {
+    ">=": lambda a, b: a >= b,
+    "<=": lambda a, b: a <= b,
+    "!=": lambda a, b: a != b,
+    "==": lambda a, b: a == b,
+    ">": lambda a, b: a > b,
+    "<": lambda a, b: a < b
+}
+ANY = "*"  # 不检查
+ABSENT = "-"  # 该 SRC 没有这个组件，机器人不能上报版本（为空或 "-"）
+
+
+def versionKey(s):
+    """
+    把版本拆成 (前缀, 版本元组)，前缀不区分大小写，不是这种格式时返回 None
+        3.4.6.2105 -> ("", (3, 4, 6, 2105))
+        v1.6.3     -> ("", (1, 6, 3))
+        f103-1.5.2 -> ("f103", (1, 5, 2))
+        m40-1.5.4  -> ("m40", (1, 5, 4))
+    比较时前缀必须相同，f103-1.5.2 与 m40-1.5.2 不可比较
+    """
+    m = VERSION_KEY_RE.match(str(s).strip())
+    if not m:
+        return None
+    prefix = (m.group(1) or "").lower()
+    return "" if prefix == "v" else prefix, tuple(int(v) for v in m.group(2).split("."))
+
+
+def srcKey(s):
+    """
+    配置表的列名和机器人上报的 SRC 统一为同一个键：SRC2000 / [SRC-2000] -> SRC-2000
+    """
+    s = str(s or "").strip()
+    return normalizeSrc(s) or s.upper()
+
+
+def compileClause(text):
+    """
+    编译一个条件，返回 match(actual) 函数
+        3.4.6.2105          相同（不区分大小写）
+        3.4.6.*  f103-1.5.? 通配符
+        3.4.6.2000~3.4.6.2200  闭区间
+        >=3.4.6,<3.5        比较，逗号分隔的多个比较都要满足
+        f103-1.5.0~f103-1.6.0  带前缀时前缀也要相同：f103-1.5.2 满足，f103-9.9.9、m40-1.5.2 不满足
+        >=f103-1.5.0        f103-1.4.9、m40-1.6.0 不满足
+        *                   不检查
+        -                   机器人不能上报该组件（为空或 "-"）
+    """
+    if text == ANY:
+        return lambda actual: True
+    if text == ABSENT:
+        return lambda actual: actual.strip() in ("", ABSENT)
+    if "~" in text:
+        low, high = (versionKey(v) for v in text.split("~", 1))
+        if low is None or high is None or low[0] != high[0]:
+            raise ValueError(f"无效的版本范围 {text}")
+
+        def inRange(actual):
+            key = versionKey(actual)
+            return key is not None and key[0] == low[0] and low[1] <= key[1] <= high[1]
+
+        return inRange
+    if text[0] in "<>=!":
+        comparisons = []
+        for part in text.split(","):
+            part = part.strip()
+            op = next((op for op in OPERATORS if part.startswith(op)), None)
+            key = versionKey(part[len(op):]) if op else None
+            if key is None:
+                raise ValueError(f"无效的版本条件 {part}")
+            comparisons.append((OPERATORS[op], key))
+
+        def compare(actual):
+            key = versionKey(actual)
+            return key is not None and all(key[0] == v[0] and fn(key[1], v[1]) for fn, v in comparisons)
+
+        return compare
+    if "*" in text or "?" in text:
+        pattern = re.compile(fnmatch.translate(text.lower()))
+        return lambda actual: pattern.match(actual.strip().lower()) is not None
+    expected = text.lower()
+    return lambda actual: actual.strip().lower() == expected
+
+
+class Rule:
+    """
+    配置表中的一个单元格，多个条件用 | 分隔，满足任意一个即可；空单元格表示没有配置，总是不一致
+    """
+
+    def __init__(self, text):
+        self.text = str(text or "").strip()
+        self.clauses = [compileClause(t.strip()) for t in self.text.split("|") if t.strip()]
+
+    def match(self, actual):
+        if not self.clauses:
+            return False
+        actual = "" if actual is None else str(actual)
+        return any(fn(actual) for fn in self.clauses)
+
+    def __str__(self):
+        return self.text
+
+
+class VersionMatcher:
+    """
+    把版本配置表编译成 {SRC 键: {组件: Rule}}，验证一台机器人只需一次字典查找和每个组件一次匹配
+    列名为 * 的列作为没有单独配置的 SRC 类型的默认规则
+
+        matcher = VersionMatcher(VersionSheet.load(xlsx), ["rbkVersion", "robodVersion", ...])
+        matcher.check("[SRC-2000]", {"rbkVersion": "3.4.6.2105", ...})
+    """
+
+    def __init__(self, sheet: VersionSheet, components):
+        self.components = list(components)
+        self.rules = {}
+        for i, src in enumerate(sheet.srcTypeList):
+            key = srcKey(src)
+            if not key or key in self.rules:
+                continue
+            try:
+                self.rules[key] = {name: Rule(row[i] if i < len(row) else "")
+                                   for name, row in zip(self.components, sheet.rows)}
+            except ValueError as e:
+                raise ValueError(f"版本配置表 {src} 列：{e}")
+
+    def rulesFor(self, srcName):
+        return self.rules.get(srcKey(srcName)) or self.rules.get("*")
+
+    def check(self, srcName, actual: dict):
+        """
+        返回 {"srcName", "items": {组件: {"expected", "actual", "ok"}}, "ok"}，配置表中没有该 SRC 时全部不一致
+        """
+        rules = self.rulesFor(srcName) or {}
+        items = {}
+        for name in self.components:
+            rule = rules.get(name)
+            value = actual.get(name, "")
+            items[name] = {"expected": str(rule) if rule else "", "actual": value,
+                           "ok": rule.match(value) if rule else False}
+        return {"srcName": srcName, "items": items, "ok": all(v["ok"] for v in items.values())}
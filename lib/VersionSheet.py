@@ -0,0 +1,73 @@
+import json
+import os
+
+from openpyxl import load_workbook
+
+CACHE_VERSION = 1
+VERSION_ROWS = 5  # 第 2~6 行依次为 RBK、Robod、SRC-PATCH、DSP、GYRO 版本
+
+
+def cachePath(xlsx):
+    """
+    与版本配置表放在一起的缓存文件
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(xlsx)), f".{os.path.basename(xlsx)}.cache.json")
+
+
+def cellText(value):
+    return "" if value is None else str(value)
+
+
+class VersionSheet:
+    """
+    解析后的版本配置表：第一行为 SRC 类型，其下 5 行为各组件的版本
+    解析结果缓存在同目录下的 .<文件名>.cache.json，按路径、修改时间和大小判断是否有效
+    """
+
+    def __init__(self, srcTypeList, rows):
+        self.srcTypeList = srcTypeList
+        self.rows = rows
+
+    @staticmethod
+    def key(xlsx):
+        st = os.stat(xlsx)
+        return [os.path.abspath(xlsx), st.st_mtime_ns, st.st_size]
+
+    @staticmethod
+    def parse(xlsx):
+        """
+        只读模式读取活动工作表的前 6 行，不加载整个工作簿
+        """
+        wb = load_workbook(xlsx, read_only=True, data_only=True)
+        try:
+            values = [[cellText(v) for v in row] for row in wb.active.iter_rows(max_row=VERSION_ROWS + 1,
+                                                                                values_only=True)]
+        finally:
+            wb.close()
+        if not values:
+            return VersionSheet([], [])
+        width = max(len(row) for row in values)
+        values = [row + [""] * (width - len(row)) for row in values]
+        rows = values[1:] + [[""] * width] * (VERSION_ROWS + 1 - len(values))
+        return VersionSheet(values[0], rows)
+
+    @staticmethod
+    def load(xlsx, useCache=True):
+        key = VersionSheet.key(xlsx)
+        path = cachePath(xlsx)
+        if useCache:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    js = json.load(f)
+                if js.get("version") == CACHE_VERSION and js.get("key") == key:
+                    return VersionSheet(js["srcTypeList"], js["rows"])
+            except (OSError, ValueError, KeyError):
+                pass
+        sheet = VersionSheet.parse(xlsx)
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "key": key, "srcTypeList": sheet.srcTypeList,
+                           "rows": sheet.rows}, f, ensure_ascii=False)
+        except OSError:
+            pass
+        return sheet
@@ -2,11 +2,14 @@ import sys
 from PySide6.QtWidgets import QApplication
 from MainWinodw import MainWindow
 from init import clearn
+from lib.ConnectionPool import pool
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
     w = MainWindow()
     w.show()
     app.exec()
+    # 关闭连接池中的空闲连接
+    pool.clear()
     # 删除临时目录
     clearn()
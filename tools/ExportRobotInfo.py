@@ -1,5 +1,4 @@
 import json
-import socket
 from datetime import datetime
 
 from PySide6.QtCore import QDir, QMargins, Qt, QPoint, Slot, QThread, QFile, QFileInfo, QRegularExpression
@@ -11,6 +10,8 @@ from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QLab
 
 from init import printLog, cfg, tempDir
 from lib.RBKUtils import RBKUtils
+from lib.Snapshot import collect
+from tools.RobotDiscovery import defaultIp, attachRobotCompleter
 
 
 class PictureViewer(QWidget):
@@ -224,8 +225,12 @@ class Thread(QThread):
         self.robodVersion = -1
         self.rbkVersion = ""
         self.rbkVersionMajor = 0
+        self.render = True  # 生成信息图片，命令行导出时可以关闭
+        self.timings = {}  # Snapshot.timings()
+        self.isSuccess = False
 
     def run(self):
+        self.isSuccess = False
 
         self.robotID = ""
         self.robot_status_info = {}
@@ -244,98 +249,106 @@ class Thread(QThread):
         self.robodVersion = -1
         self.rbkVersion = ""
         self.rbkVersionMajor = 0
-
-        try:
-            printLog(f"连接 {self.ip}:19204")
-            so: socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            so.connect((self.ip, 19204))
-            so.settimeout(60)
-            printLog("查询机器人信息")
-            _, data = RBKUtils.request(so, 1000)
-            self.robot_status_info = json.loads(data)
-
-            self.rbkVersion = self.robot_status_info.get("version", "")
-            try:
-                self.rbkVersionMajor = int(self.rbkVersion.split(".")[0][-1])
-            except:
-                self.rbkVersionMajor = 0
-            printLog("Robokit版本：", self.rbkVersion)
-            if self.rbkVersionMajor >= 4:
-                printLog("查询机器人报警信息")
-                js = {
-                    "node_name": "ServiceNetProtocol",
-                    "service_name": "serviceDispatcher",
-                    "request": {
-                        "dataType": "json",
-                        "func_name": "getAllChannelData",
-                        "list": [
-                            {
-                                "channelName": "alarms",
-                                "messageName": "rbk4.protocol.Message_Alarms"
-                            }
-                        ]
-                    }
-                }
-                _, data = RBKUtils.request(so, 1999, js)
-                self.robot_status_alarm_info = json.loads(data)
-            else:
-                printLog("查询机器人运行信息")
-                _, data = RBKUtils.request(so, 1002)
-                self.robot_status_run_info = json.loads(data)
-                printLog("查询机器人电池信息")
-                _, data = RBKUtils.request(so, 1007)
-                self.robot_status_battery_info = json.loads(data)
-                printLog("查询机器人报警信息")
-                _, data = RBKUtils.request(so, 1050)
-                self.robot_status_alarm_info = json.loads(data)
-        except Exception as e:
-            printLog("Exception:,", e)
+        self.timings = {}
+
+        printLog(f"连接 {self.ip}:19204 / 19208")
+        snapshot = collect(self.ip, {"status": (19204, self.queryStatus), "core": (19208, self.queryCore)})
+        self.timings = snapshot.timings()
+        if not snapshot.ok:
+            for e in snapshot.errors().values():
+                printLog("Exception:,", e)
             self.widgetPixmap = None
             return
-        else:
-            printLog(f"关闭连接 {self.ip}:19204")
-            so.close()
-        try:
-            printLog(f"连接 {self.ip}:19208")
-            so: socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            so.connect((self.ip, 19208))
-            so.settimeout(60)
-            printLog("查询 Robod 版本")
-            _, data = RBKUtils.request(so, 5041)
-            self.robot_core_robod_version_info = json.loads(data)
-
-            version_info: dict = json.loads(data)
-            self.robodVersion = int(version_info.get("version").split(".")[0])
-            printLog("查询 Robokit 运行状态")
-
-            if self.robodVersion >= 5:
-                _, data = RBKUtils.request(so, 5136, {"type": "getAllNetworkInterfaces"})
-                self.robot_all_network_interfaces = json.loads(data)
-                _, data = RBKUtils.request(so, 5136, {"type": "getCpuSerialForRobotID"})
-                self.robot_cpu_serial_for_robot_id = json.loads(data)
-                _, data = RBKUtils.request(so, 5136, {"type": "getLastImportedParamFileName"})
-                self.robot_last_imported_param_file_name = json.loads(data)
-
-                _, data = RBKUtils.request(so, 5136, {"type": "getRBKStatus"})
-            else:
-                _, data = RBKUtils.request(so, 5011)
-
-            self.robot_core_status_info = json.loads(data)
-        except Exception as e:
-            printLog("Exception:,", e)
-            self.widgetPixmap = None
-            return
-        else:
-            printLog(f"关闭连接 {self.ip}:19208")
-            so.close()
+        printLog(f"查询耗时 {snapshot.timingText()}")
         if self.robodVersion >= 5:
             self.robotID = self.robot_cpu_serial_for_robot_id.get('cpuSerialForRobotID', "")
         else:
             self.robotID = self.robot_status_info.get('id', "")
-        printLog(f"生成机器人信息图片 {self.robotID}")
-        self.offScreenRenderingWidget()
+        if self.render:
+            printLog(f"生成机器人信息图片 {self.robotID}")
+            self.offScreenRenderingWidget()
+        self.isSuccess = True
         printLog(f"完成 {self.robotID}")
 
+    def queryStatus(self, so):
+        """
+        19204：机器人信息、运行信息、电池信息、报警信息
+        """
+        printLog("查询机器人信息")
+        _, data = RBKUtils.request(so, 1000)
+        self.robot_status_info = RBKUtils.loads(data)
+
+        self.rbkVersion = self.robot_status_info.get("version", "")
+        try:
+            self.rbkVersionMajor = int(self.rbkVersion.split(".")[0][-1])
+        except:
+            self.rbkVersionMajor = 0
+        printLog("Robokit版本：", self.rbkVersion)
+        if self.rbkVersionMajor >= 4:
+            printLog("查询机器人报警信息")
+            js = {
+                "node_name": "ServiceNetProtocol",
+                "service_name": "serviceDispatcher",
+                "request": {
+                    "dataType": "json",
+                    "func_name": "getAllChannelData",
+                    "list": [
+                        {
+                            "channelName": "alarms",
+                            "messageName": "rbk4.protocol.Message_Alarms"
+                        }
+                    ]
+                }
+            }
+            _, data = RBKUtils.request(so, 1999, js)
+            self.robot_status_alarm_info = RBKUtils.loads(data)
+        else:
+            printLog("查询机器人运行信息、电池信息、报警信息")
+            (_, runData), (_, batteryData), (_, alarmData) = RBKUtils.pipeline(so, [(1002,), (1007,), (1050,)])
+            self.robot_status_run_info = RBKUtils.loads(runData)
+            self.robot_status_battery_info = RBKUtils.loads(batteryData)
+            self.robot_status_alarm_info = RBKUtils.loads(alarmData)
+
+    def queryCore(self, so):
+        """
+        19208：Robod 版本、网卡、CPU 序列号、参数文件、Robokit 运行状态
+        """
+        printLog("查询 Robod 版本")
+        _, data = RBKUtils.request(so, 5041)
+        self.robot_core_robod_version_info = RBKUtils.loads(data)
+
+        version_info: dict = RBKUtils.loads(data)
+        self.robodVersion = int(version_info.get("version").split(".")[0])
+        printLog("查询 Robokit 运行状态")
+
+        if self.robodVersion >= 5:
+            (_, networkData), (_, serialData), (_, paramData), (_, data) = RBKUtils.pipeline(so, [
+                (5136, {"type": "getAllNetworkInterfaces"}),
+                (5136, {"type": "getCpuSerialForRobotID"}),
+                (5136, {"type": "getLastImportedParamFileName"}),
+                (5136, {"type": "getRBKStatus"})
+            ])
+            self.robot_all_network_interfaces = RBKUtils.loads(networkData)
+            self.robot_cpu_serial_for_robot_id = RBKUtils.loads(serialData)
+            self.robot_last_imported_param_file_name = RBKUtils.loads(paramData)
+        else:
+            _, data = RBKUtils.request(so, 5011)
+
+        self.robot_core_status_info = RBKUtils.loads(data)
+
+    def exportTo(self, directory):
+        """
+        保存信息图片（已生成时）和原始数据到 directory
+        """
+        saveDir = QDir(directory)
+        saveDir.mkpath(saveDir.absolutePath())
+        if self.widgetPixmap is not None:
+            self.widgetPixmap.save(saveDir.filePath(self.robotID + ".png"))
+        for name in ["robot_status_info", "robot_status_run_info", "robot_status_battery_info",
+                     "robot_status_alarm_info", "robot_core_status_info", "robot_core_robod_version_info"]:
+            with open(saveDir.filePath(name + ".json"), "w") as f:
+                json.dump(getattr(self, name), f)
+
     def ms2dateStr(self, ms):
         s = ms // 1000
         d = s // (24 * 3600)
@@ -565,13 +578,7 @@ class Thread(QThread):
         gridLayout.addWidget(newLine(QFrame.Shape.VLine), 0, column, 2, 1)
         column += 1
         gridLayout.addWidget(alignLabel("守护进程版本"), 0, column)
-        srcName = self.robot_core_robod_version_info.get("srcName")
-        if not srcName:
-            srcType = self.robot_core_robod_version_info.get("SRCType", -1)
-            if 0 <= srcType <= 4:
-                srcName = ["[SRC-2000]", "[SRC-3000]", "[SRC-800]", "[SRC-2000.2]", "[SRC-2000.1]"][srcType]
-            else:
-                srcName = "[SRC-?]"
+        srcName = RBKUtils.srcName(self.robot_core_robod_version_info)
         gridLayout.addWidget(alignLabel(f"{self.robot_core_robod_version_info.get('version', '')} {srcName}"), 1,
                              column)
 
@@ -608,6 +615,16 @@ class Thread(QThread):
         self.widgetPixmap = pixmap
 
 
+def exportDirectory(robotID):
+    """
+    导出目录下按机器人 ID 和时间新建的子目录
+    """
+    saveDir = cfg[ExportRobotInfo.__name__, "export_directory"]
+    if not saveDir:
+        saveDir = ExportRobotInfo.META["config"]["export_directory"]["value"]
+    return saveDir + "/" + robotID + datetime.now().strftime("_%Y%m%d%H%M%S")
+
+
 class ExportRobotInfo(QWidget):
     META = {
         "title": "导出机器人配置信息",
@@ -641,7 +658,8 @@ class ExportRobotInfo(QWidget):
 
         hLayout = QHBoxLayout()
         hLayout.addWidget(QLabel("IP:"))
-        self.ipLineEdit = QLineEdit("192.168.192.5")
+        self.ipLineEdit = QLineEdit(defaultIp())
+        attachRobotCompleter(self.ipLineEdit)
         self.ipLineEdit.setValidator(QRegularExpressionValidator(
             QRegularExpression(r"((2(5[0-5]|[0-4]\d))|[0-1]?\d{1,2})(\.((2(5[0-5]|[0-4]\d))|[0-1]?\d{1,2})){3}"), self))
         hLayout.addWidget(self.ipLineEdit)
@@ -686,14 +704,10 @@ class ExportRobotInfo(QWidget):
 
     def slotSaveButtonClicked(self):
         # 创建一个目录
-        saveDir = cfg[self.__class__.__name__, "export_directory"]
-        if not saveDir:
-            saveDir = ExportRobotInfo.META["config"]["export_directory"]["value"]
-        saveDir = QDir(saveDir + "/" + self.workThread.robotID + datetime.now().strftime("_%Y%m%d%H%M%S"))
-        saveDir.mkpath(saveDir.absolutePath())
+        saveDir = QDir(exportDirectory(self.workThread.robotID))
         printLog(f"导出机器人配置信息 到 {saveDir.absolutePath()}")
-        # 保存图片
-        self.workThread.widgetPixmap.save(saveDir.filePath(self.workThread.robotID + ".png"))
+        # 保存图片和原始数据
+        self.workThread.exportTo(saveDir.absolutePath())
         # 控制器的图片
         if self.pictureWidget1.picturePath:
             file = QFileInfo(self.pictureWidget1.picturePath)
@@ -701,21 +715,6 @@ class ExportRobotInfo(QWidget):
         if self.pictureWidget2.picturePath:
             file = QFileInfo(self.pictureWidget2.picturePath)
             QFile.copy(self.pictureWidget2.picturePath, saveDir.filePath(file.fileName()))
-
-        # 原始数据
-        with open(saveDir.filePath("robot_status_info.json"), "w") as f:
-            json.dump(self.workThread.robot_status_info, f)
-        with open(saveDir.filePath("robot_status_run_info.json"), "w") as f:
-            json.dump(self.workThread.robot_status_run_info, f)
-        with open(saveDir.filePath("robot_status_battery_info.json"), "w") as f:
-            json.dump(self.workThread.robot_status_battery_info, f)
-        with open(saveDir.filePath("robot_status_alarm_info.json"), "w") as f:
-            json.dump(self.workThread.robot_status_alarm_info, f)
-
-        with open(saveDir.filePath("robot_core_status_info.json"), "w") as f:
-            json.dump(self.workThread.robot_core_status_info, f)
-        with open(saveDir.filePath("robot_core_robod_version_info.json"), "w") as f:
-            json.dump(self.workThread.robot_core_robod_version_info, f)
         printLog(f"完成")
 
     def slotWorkThreadFinished(self):
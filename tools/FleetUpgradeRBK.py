@@ -0,0 +1,281 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtCore import Qt, QThread, Signal
+from PySide6.QtGui import QStandardItemModel, QStandardItem, QColor
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QListView, QTableView, \
+    QPlainTextEdit, QSpinBox, QDoubleSpinBox, QSplitter, QFileDialog
+
+from init import cfg, printLog
+from lib.BandwidthScheduler import BandwidthScheduler, MB
+from lib.IPUtils import parseTargets
+from lib.PackageCatalog import PackageCatalog
+from lib.TransferMeter import formatTransfer
+from tools.UpgradeRBK import Upgrader, CatalogThread, fillPackageModel, optionCheckBox, saveOption
+
+
+class FleetUpgrader:
+    """
+    批量升级，不依赖界面，FleetThread 和命令行共用
+    上传完成前网络中断且重试用完的机器人在其它机器人完成后重新排队，最多 requeueRounds 轮
+    onStatus(ip, text)、onTransfer(ip, snapshot) 同 Upgrader，onResult(ip, state, upgrader) 在每台机器人结束时调用
+    """
+
+    def __init__(self, ips, filePath, concurrency=4, globalRate=0, groupRate=0, retries=3, skipCurrent=False,
+                 packageInfo=None, catalog: PackageCatalog = None, onStatus=None, onTransfer=None, onResult=None):
+        self.ips = ips
+        self.filePath = filePath
+        self.concurrency = concurrency
+        self.globalRate = globalRate  # MB/s，0 为不限速
+        self.groupRate = groupRate  # 每个子网 MB/s，0 为不限速
+        self.retries = retries  # 单台机器人的重试次数
+        self.requeueRounds = 2
+        self.skipCurrent = skipCurrent
+        self.packageInfo = packageInfo
+        self.catalog = catalog
+        self.onStatus = onStatus
+        self.onTransfer = onTransfer
+        self.onResult = onResult
+        self.scheduler: BandwidthScheduler = None
+        self.results = {}
+        self.requeue = []
+        self.lastRound = True
+
+    def upgradeOne(self, ip):
+        upgrader = Upgrader(ip, self.filePath, self.onStatus, self.scheduler, self.packageInfo,
+                            self.skipCurrent, self.catalog, self.onTransfer, self.retries)
+        state = upgrader.run()
+        self.results[ip] = state
+        if state == 2 and upgrader.retryable and not self.lastRound:
+            self.requeue.append(ip)
+        elif self.onResult is not None:
+            self.onResult(ip, state, upgrader)
+
+    def run(self):
+        """
+        返回 {ip: 1:成功 2:失败 3:已是目标版本}
+        """
+        self.results = {}
+        self.scheduler = None
+        if self.globalRate > 0 or self.groupRate > 0:
+            self.scheduler = BandwidthScheduler(self.globalRate * MB, self.groupRate * MB)
+        printLog(f"批量升级 {len(self.ips)} 台，并发 {self.concurrency}，升级包 {self.filePath}")
+        pending = self.ips
+        for n in range(self.requeueRounds + 1):
+            self.requeue = []
+            self.lastRound = n == self.requeueRounds
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                list(executor.map(self.upgradeOne, pending))
+            if not self.requeue:
+                break
+            printLog(f"{len(self.requeue)} 台机器人网络中断，重新排队（第 {n + 1} 轮）")
+            if self.onStatus is not None:
+                for ip in self.requeue:
+                    self.onStatus(ip, "重新排队")
+            pending = self.requeue
+        success = sum(1 for v in self.results.values() if v == 1)
+        skipped = sum(1 for v in self.results.values() if v == 3)
+        printLog(f"批量升级完成 成功 {success} 台，跳过 {skipped} 台，失败 {len(self.results) - success - skipped} 台")
+        return self.results
+
+
+class FleetThread(QThread):
+    sigStatus = Signal(str, str)  # ip, 状态
+    sigResult = Signal(str, int)  # ip, 1:成功 2:失败 3:已是目标版本
+    sigTransfer = Signal(str, object)  # ip, TransferMeter.snapshot()
+
+    def __init__(self):
+        super().__init__()
+        self.ips = []
+        self.filePath = ""
+        self.packageInfo = None
+        self.skipCurrent = False
+        self.catalog: PackageCatalog = None
+        self.concurrency = 4
+        self.globalRate = 0  # MB/s，0 为不限速
+        self.groupRate = 0  # 每个子网 MB/s，0 为不限速
+        self.retries = 3
+        self.results = {}
+
+    def run(self):
+        self.results = FleetUpgrader(self.ips, self.filePath, self.concurrency, self.globalRate, self.groupRate,
+                                     self.retries, self.skipCurrent, self.packageInfo, self.catalog,
+                                     self.sigStatus.emit, self.sigTransfer.emit,
+                                     lambda ip, state, upgrader: self.sigResult.emit(ip, state)).run()
+
+
+class FleetUpgradeRBK(QWidget):
+    META = {
+        "title": "批量升级 RBK"
+    }
+
+    def __init__(self):
+        super().__init__()
+
+        self.workThread = FleetThread()
+        self.catalogThread = CatalogThread()
+        self.packageModel = QStandardItemModel()
+        self.resultModel = QStandardItemModel()
+        self.rows = {}  # ip -> 行号
+        self.initUI()
+
+        self.workThread.sigStatus.connect(self.slotStatus)
+        self.workThread.sigResult.connect(self.slotResult)
+        self.workThread.sigTransfer.connect(self.slotTransfer)
+        self.workThread.finished.connect(self.slotWorkThreadFinished)
+        self.catalogThread.finished.connect(self.slotCatalogRefreshed)
+        self.refreshButton.click()
+
+    def initUI(self):
+        layout = QVBoxLayout(self)
+
+        hLayout = QHBoxLayout()
+        layout.addLayout(hLayout)
+        hLayout.addWidget(QLabel("并发数:"))
+        self.concurrencySpinBox = QSpinBox()
+        self.concurrencySpinBox.setRange(1, 64)
+        try:
+            self.concurrencySpinBox.setValue(int(cfg[self.__class__.__name__, "concurrency"]))
+        except:
+            self.concurrencySpinBox.setValue(4)
+        hLayout.addWidget(self.concurrencySpinBox)
+        hLayout.addWidget(QLabel("总带宽(MB/s):"))
+        self.globalRateSpinBox = self.rateSpinBox("global_rate")
+        hLayout.addWidget(self.globalRateSpinBox)
+        hLayout.addWidget(QLabel("子网带宽(MB/s):"))
+        self.groupRateSpinBox = self.rateSpinBox("group_rate")
+        hLayout.addWidget(self.groupRateSpinBox)
+        hLayout.addWidget(QLabel("重试次数:"))
+        self.retriesSpinBox = QSpinBox()
+        self.retriesSpinBox.setRange(0, 10)
+        try:
+            self.retriesSpinBox.setValue(int(cfg[self.__class__.__name__, "retries"]))
+        except:
+            self.retriesSpinBox.setValue(3)
+        hLayout.addWidget(self.retriesSpinBox)
+        hLayout.addStretch()
+        self.skipCurrentCheckBox = optionCheckBox(self.__class__.__name__, "skip_current")
+        hLayout.addWidget(self.skipCurrentCheckBox)
+        self.useDeltaCheckBox = optionCheckBox(self.__class__.__name__, "use_delta")
+        hLayout.addWidget(self.useDeltaCheckBox)
+        self.importButton = QPushButton("导入 IP 列表")
+        hLayout.addWidget(self.importButton)
+        self.refreshButton = QPushButton("刷新文件列表")
+        hLayout.addWidget(self.refreshButton)
+        self.startUpgradeButton = QPushButton("开始批量升级")
+        hLayout.addWidget(self.startUpgradeButton)
+
+        splitter = QSplitter(Qt.Orientation.Horizontal)
+        layout.addWidget(splitter)
+
+        leftWidget = QWidget()
+        leftLayout = QVBoxLayout(leftWidget)
+        leftLayout.setContentsMargins(0, 0, 0, 0)
+        leftLayout.addWidget(QLabel("IP 列表（每行一个 IP / CIDR / 范围，如 192.168.192.0/24、192.168.192.10-20）:"))
+        self.targetsEdit = QPlainTextEdit()
+        leftLayout.addWidget(self.targetsEdit)
+        leftLayout.addWidget(QLabel("升级包:"))
+        self.filesListView = QListView()
+        self.filesListView.setModel(self.packageModel)
+        leftLayout.addWidget(self.filesListView)
+        splitter.addWidget(leftWidget)
+
+        self.tableView = QTableView()
+        self.tableView.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
+        self.tableView.horizontalHeader().setStretchLastSection(True)
+        self.tableView.setModel(self.resultModel)
+        splitter.addWidget(self.tableView)
+
+        self.importButton.clicked.connect(self.slotImportButtonClicked)
+        self.refreshButton.clicked.connect(self.slotRefreshButtonClicked)
+        self.startUpgradeButton.clicked.connect(self.slotStartUpgradeButtonClicked)
+
+    def rateSpinBox(self, key):
+        w = QDoubleSpinBox()
+        w.setRange(0, 1000)
+        w.setDecimals(1)
+        w.setSpecialValueText("不限")
+        w.setToolTip("0 为不限速")
+        try:
+            w.setValue(float(cfg[self.__class__.__name__, key]))
+        except:
+            w.setValue(0)
+        return w
+
+    def saveSetting(self, key, value):
+        if cfg[self.__class__.__name__, key] != str(value):
+            cfg[self.__class__.__name__, key] = value
+
+    def slotImportButtonClicked(self):
+        file = QFileDialog.getOpenFileName(self, "导入 IP 列表", "", "text file (*.txt *.csv);;all (*)")
+        if not file[0]:
+            return
+        with open(file[0], "r", encoding="utf-8") as f:
+            self.targetsEdit.appendPlainText(f.read())
+
+    def slotRefreshButtonClicked(self):
+        if self.catalogThread.isRunning():
+            return
+        self.refreshButton.setDisabled(True)
+        self.catalogThread.start()
+
+    def slotCatalogRefreshed(self):
+        self.refreshButton.setEnabled(True)
+        fillPackageModel(self.packageModel, self.catalogThread.catalog)
+        self.filesListView.setCurrentIndex(self.packageModel.index(0, 0))
+
+    def slotStartUpgradeButtonClicked(self):
+        filePath = self.filesListView.currentIndex().data(Qt.ItemDataRole.UserRole)
+        if not filePath:
+            printLog("没有选择升级包")
+            return
+        try:
+            ips = parseTargets(self.targetsEdit.toPlainText())
+        except Exception as e:
+            printLog("IP 列表格式错误：", e)
+            return
+        if not ips:
+            printLog("没有需要升级的 IP")
+            return
+
+        self.resultModel.clear()
+        self.resultModel.setHorizontalHeaderLabels(["IP", "状态", "上传", "结果"])
+        self.rows = {}
+        for ip in ips:
+            self.rows[ip] = self.resultModel.rowCount()
+            self.resultModel.appendRow([QStandardItem(ip), QStandardItem("等待"), QStandardItem(""), QStandardItem("")])
+
+        concurrency = self.concurrencySpinBox.value()
+        self.saveSetting("concurrency", concurrency)
+        self.saveSetting("global_rate", self.globalRateSpinBox.value())
+        self.saveSetting("group_rate", self.groupRateSpinBox.value())
+        self.saveSetting("retries", self.retriesSpinBox.value())
+        self.startUpgradeButton.setDisabled(True)
+        self.workThread.ips = ips
+        self.workThread.filePath = filePath
+        catalog = self.catalogThread.catalog
+        self.workThread.skipCurrent = saveOption(self.__class__.__name__, "skip_current", self.skipCurrentCheckBox)
+        self.workThread.packageInfo = catalog.get(filePath) if catalog else None
+        self.workThread.catalog = catalog if saveOption(self.__class__.__name__, "use_delta", self.useDeltaCheckBox) else None
+        self.workThread.concurrency = concurrency
+        self.workThread.globalRate = self.globalRateSpinBox.value()
+        self.workThread.groupRate = self.groupRateSpinBox.value()
+        self.workThread.retries = self.retriesSpinBox.value()
+        self.workThread.start()
+
+    def slotStatus(self, ip, text):
+        if ip in self.rows:
+            self.resultModel.item(self.rows[ip], 1).setText(text)
+
+    def slotTransfer(self, ip, snapshot):
+        if ip in self.rows:
+            self.resultModel.item(self.rows[ip], 2).setText(formatTransfer(snapshot))
+
+    def slotResult(self, ip, state):
+        if ip not in self.rows:
+            return
+        item = self.resultModel.item(self.rows[ip], 3)
+        item.setText({1: "成功", 3: "跳过（未上传）"}.get(state, "失败"))
+        item.setForeground({1: QColor(25, 200, 25), 3: QColor(220, 140, 0)}.get(state, QColor(200, 25, 25)))
+
+    def slotWorkThreadFinished(self):
+        self.startUpgradeButton.setEnabled(True)
@@ -1,13 +1,29 @@
-import json
-import socket
-
 from PySide6.QtCore import QRegularExpression, QThread, Qt
 from PySide6.QtGui import QRegularExpressionValidator
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton
 import requests
 
 from init import printLog
+from lib.Codec import LazyJson
+from lib.ConnectionPool import pool
 from lib.RBKUtils import RBKUtils
+from lib.Snapshot import collect
+from tools.RobotDiscovery import defaultIp, attachRobotCompleter
+
+
+def activationError(js: LazyJson, data):
+    """
+    激活响应中的错误信息，成功时返回空字符串
+    JSON 区或数据区中有 err_msg，或 ret_code 不为 0 时视为失败；数据区不是 JSON 时只看 JSON 区
+    """
+    for part in (js, data):
+        try:
+            obj = part.value if isinstance(part, LazyJson) else RBKUtils.loads(part) if len(part) else {}
+        except Exception:
+            continue
+        if isinstance(obj, dict) and (obj.get("err_msg") or obj.get("ret_code", 0) != 0):
+            return str(obj.get("err_msg") or f"ret_code {obj.get('ret_code')}")
+    return ""
 
 
 class Thread(QThread):
@@ -16,22 +32,36 @@ class Thread(QThread):
     def __init__(self):
         super().__init__()
         self.ip = "192.168.192.5"
+        self.isSuccess = False
+        self.response = ""
+        self.error = ""
 
     def run(self):
-        try:
-            printLog(f"连接 {self.ip}:19204")
-            so: socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            so.connect((self.ip, 19204))
-            so.settimeout(60)
+        self.isSuccess = False
+        self.response = ""
+        self.error = ""
+
+        def queryStatus(so):
             printLog("查询机器人信息")
             _, data = RBKUtils.request(so, 1000)
-            robot_status_info = json.loads(data)
-        except Exception as e:
-            printLog("Exception:,", e)
+            return RBKUtils.loads(data)
+
+        def queryRobod(so):
+            printLog("查询 Robod 版本")
+            _, data = RBKUtils.request(so, 5041)
+            return RBKUtils.loads(data)
+
+        # 授权文件下载前先同时查询两个端口，上传时 Robod 版本已知
+        printLog(f"连接 {self.ip}:19204 / 19208")
+        snapshot = collect(self.ip, {"status": (19204, queryStatus), "robod": (19208, queryRobod)})
+        if not snapshot.ok:
+            for e in snapshot.errors().values():
+                printLog("Exception:,", e)
+            self.error = "; ".join(f"{name}: {e}" for name, e in snapshot.errors().items())
             return
-        else:
-            printLog(f"关闭连接 {self.ip}:19204")
-            so.close()
+        printLog(f"查询耗时 {snapshot.timingText()}")
+        robot_status_info = snapshot["status"]
+        version_info: dict = snapshot["robod"]
 
         # for feature in robot_status_info.get('features', []):
         #     if not isinstance(feature, dict):
@@ -71,14 +101,17 @@ class Thread(QThread):
             data: list = res.json().get("data", [])
             if len(data) == 0:
                 printLog("没有查询到授权信息")
+                self.error = "没有查询到授权信息"
                 return
             files = data[0].get("file", [])
             if len(files) == 0:
                 printLog("没有查询到授权信息")
+                self.error = "没有查询到授权信息"
                 return
             licenseUrl = files[0].get("url")
         except Exception as e:
             printLog(e)
+            self.error = f"查询授权信息失败：{e}"
             return
 
         try:
@@ -86,33 +119,32 @@ class Thread(QThread):
             res = requests.request("get", licenseUrl)
         except Exception as e:
             printLog(e)
+            self.error = f"下载授权文件失败：{e}"
             return
 
         d = res.text.encode()
         printLog("授权信息：", d)
         try:
             printLog(f"连接 {self.ip}:19208")
-            so: socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            so.connect((self.ip, 19208))
-            so.settimeout(60)
-            printLog("查询 Robod 版本")
-            _, data = RBKUtils.request(so, 5041)
-
-            version_info: dict = json.loads(data)
             robodVersion = int(version_info.get("version").split(".")[0])
             printLog("Robod版本：", version_info.get("version"), "主版本：", robodVersion)
-            printLog(f"上传授权文件 ({'新' if robodVersion >= 5 else '旧'}协议) {self.ip}")
-            if robodVersion >= 5:
-                j, d = RBKUtils.request(so, 5136, {"type": "activeRobot"}, d)
-            else:
-                j, d = RBKUtils.request(so, 5106, None, d)
-            printLog("上传授权响应：", j, d)
+            with pool.connection(self.ip, 19208) as so:
+                printLog(f"上传授权文件 ({'新' if robodVersion >= 5 else '旧'}协议) {self.ip}")
+                if robodVersion >= 5:
+                    j, d = RBKUtils.request(so, 5136, {"type": "activeRobot"}, d)
+                else:
+                    j, d = RBKUtils.request(so, 5106, None, d)
+            self.response = bytes(d).decode(errors="replace")
+            printLog("上传授权响应：", j, self.response)
+            self.error = activationError(j, d)
         except Exception as e:
             printLog("Exception:,", e)
+            self.error = f"上传授权文件失败：{e}"
+            return
+        if self.error:
+            printLog(f"激活失败 {self.ip}：{self.error}")
             return
-        else:
-            printLog(f"关闭连接 {self.ip}:19208")
-            so.close()
+        self.isSuccess = True
 
 
 class OnlineActivation(QWidget):
@@ -134,7 +166,8 @@ class OnlineActivation(QWidget):
         hLayout = QHBoxLayout()
         layout.addLayout(hLayout)
         hLayout.addWidget(QLabel("IP:"))
-        self.ipLineEdit = QLineEdit("192.168.192.5")
+        self.ipLineEdit = QLineEdit(defaultIp())
+        attachRobotCompleter(self.ipLineEdit)
         self.ipLineEdit.setValidator(QRegularExpressionValidator(
             QRegularExpression(r"((2(5[0-5]|[0-4]\d))|[0-1]?\d{1,2})(\.((2(5[0-5]|[0-4]\d))|[0-1]?\d{1,2})){3}"), self))
         hLayout.addWidget(self.ipLineEdit)
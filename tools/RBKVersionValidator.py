@@ -1,17 +1,17 @@
-import json
 import os.path
-import socket
 
 from PySide6.QtCore import QDir, QRegularExpression, QThread, Qt
 from PySide6.QtGui import QRegularExpressionValidator, QStandardItemModel, QStandardItem, QFont, QPainter, QPainterPath, \
     QColor, QPen
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QTableView, \
     QGridLayout, QSpacerItem, QFrame
-from openpyxl.reader.excel import load_workbook
-from openpyxl.worksheet.worksheet import Worksheet
 
 from init import cfg, printLog
 from lib.RBKUtils import RBKUtils
+from lib.Snapshot import collect
+from lib.VersionMatcher import VersionMatcher
+from lib.VersionSheet import VersionSheet
+from tools.RobotDiscovery import defaultIp, attachRobotCompleter
 
 
 class Thread(QThread):
@@ -24,61 +24,112 @@ class Thread(QThread):
         self.srcPatch = ""
         self.robodVersion = ""
         self.srcName = ""
+        self.timings = {}  # Snapshot.timings()
         self.isSuccess = False
 
     def run(self):
         self.isSuccess = False
-        try:
-            printLog(f"连接 {self.ip}:19204")
-            so: socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            so.connect((self.ip, 19204))
-            so.settimeout(60)
+        self.timings = {}
+
+        def queryStatus(so):
             printLog("查询机器人信息")
             _, data = RBKUtils.request(so, 1000)
-            robot_status_info = json.loads(data)
-            self.rbkVersion = robot_status_info.get('version', '')
-            self.dspVersion = robot_status_info.get('dsp_version', "")
-            self.gyroVersion = robot_status_info.get('gyro_version', "")
-            for k, v in robot_status_info.get('VERSION_LIST', {}).items():
-                if k == "x86-patch" or k == "arm-patch":
-                    self.srcPatch = v
-                    break
-            else:
-                self.srcPatch = ""
-        except Exception as e:
-            printLog("Exception:,", e)
-            return
-        else:
-            printLog(f"关闭连接 {self.ip}:19204")
-            so.close()
-        try:
-            printLog(f"连接 {self.ip}:19208")
-            so: socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            so.connect((self.ip, 19208))
-            so.settimeout(60)
+            return RBKUtils.lazy(data)
+
+        def queryRobod(so):
             printLog("查询 Robod 版本")
             _, data = RBKUtils.request(so, 5041)
-            robot_core_robod_version_info = json.loads(data)
-
-            self.srcName = robot_core_robod_version_info.get("srcName")
-            if not self.srcName:
-                srcType = robot_core_robod_version_info.get("SRCType", -1)
-                if 0 <= srcType <= 4:
-                    self.srcName = ["[SRC-2000]", "[SRC-3000]", "[SRC-800]", "[SRC-2000.2]", "[SRC-2000.1]"][srcType]
-                else:
-                    self.srcName = "[SRC-?]"
-            self.robodVersion = robot_core_robod_version_info.get('version', '')
-
-        except Exception as e:
-            printLog("Exception:,", e)
+            return RBKUtils.lazy(data)
+
+        printLog(f"连接 {self.ip}:19204 / 19208")
+        snapshot = collect(self.ip, {"status": (19204, queryStatus), "robod": (19208, queryRobod)})
+        self.timings = snapshot.timings()
+        if not snapshot.ok:
+            for e in snapshot.errors().values():
+                printLog("Exception:,", e)
             return
+
+        robot_status_info = snapshot["status"]
+        self.rbkVersion = robot_status_info.get('version', '')
+        self.dspVersion = robot_status_info.get('dsp_version', "")
+        self.gyroVersion = robot_status_info.get('gyro_version', "")
+        for k, v in robot_status_info.get('VERSION_LIST', {}).items():
+            if k == "x86-patch" or k == "arm-patch":
+                self.srcPatch = v
+                break
         else:
-            printLog(f"关闭连接 {self.ip}:19208")
-            so.close()
+            self.srcPatch = ""
+
+        robot_core_robod_version_info = snapshot["robod"]
+        self.srcName = RBKUtils.srcName(robot_core_robod_version_info)
+        self.robodVersion = robot_core_robod_version_info.get('version', '')
+
         printLog("SRC:%s,RBK:%s,DPS:%s,GYRO:%s,SRC-PATCH:%s,ROBOD:%s"%(self.srcName, self.rbkVersion, self.dspVersion, self.gyroVersion, self.srcPatch, self.robodVersion))
+        printLog(f"查询耗时 {snapshot.timingText()}")
         self.isSuccess = True
 
 
+def versionSheetPath():
+    xlsx = cfg[RBKVersionValidator.__name__, "rbk_version_excel"]
+    if not xlsx:
+        xlsx = RBKVersionValidator.META["config"]["rbk_version_excel"]["value"]
+    return xlsx
+
+
+VERSION_ITEMS = ["rbkVersion", "robodVersion", "srcPatch", "dspVersion", "gyroVersion"]
+VERSION_LABELS = ["Robokit", "Robod", "SRC-PATCH", "DSP", "GYRO"]
+
+
+def versionMatcher(sheet: VersionSheet):
+    return VersionMatcher(sheet, VERSION_ITEMS)
+
+
+def validate(thread: Thread, matcher: VersionMatcher):
+    """
+    按版本配置表验证查询结果，返回 {"srcName", "items": {名称: {"expected", "actual", "ok"}}, "ok"}
+    """
+    return matcher.check(thread.srcName, {name: getattr(thread, name) for name in VERSION_ITEMS})
+
+
+def auditRobot(ip, matcher: VersionMatcher):
+    """
+    查询一台机器人并按版本配置表验证，返回 validate 的结果加上 "ip"，查询失败时包含 "error"
+    """
+    t = Thread()
+    t.ip = ip
+    t.run()
+    if not t.isSuccess:
+        return {"ip": ip, "ok": False, "error": "查询版本失败", "timings": t.timings}
+    res = validate(t, matcher)
+    res["ip"] = ip
+    res["timings"] = t.timings
+    return res
+
+
+class SheetThread(QThread):
+    """
+    在后台加载版本配置表，优先使用缓存
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.xlsx = ""
+        self.sheet: VersionSheet = None
+        self.matcher: VersionMatcher = None
+        self.error = ""
+
+    def run(self):
+        self.sheet = None
+        self.matcher = None
+        self.error = ""
+        try:
+            self.sheet = VersionSheet.load(self.xlsx)
+            self.matcher = versionMatcher(self.sheet)
+        except Exception as e:
+            self.sheet = None
+            self.error = str(e)
+
+
 class ResultIcon(QWidget):
     def __init__(self):
         super().__init__()
@@ -122,18 +173,22 @@ class RBKVersionValidator(QWidget):
 
     def __init__(self):
         super().__init__()
+        self.sheet: VersionSheet = None
+        self.matcher: VersionMatcher = None
+        self.sheetThread = SheetThread()
+        self.sheetThread.finished.connect(self.slotSheetThreadFinished)
         self.initUI()
 
         self.workThread = Thread()
         self.workThread.finished.connect(self.slotWorkThreadFinished)
-        self.srcTypeList = []
 
     def initUI(self):
         layout = QVBoxLayout(self)
 
         hLayout = QHBoxLayout()
         hLayout.addWidget(QLabel("IP:"))
-        self.ipLineEdit = QLineEdit("192.168.192.5")
+        self.ipLineEdit = QLineEdit(defaultIp())
+        attachRobotCompleter(self.ipLineEdit)
         self.ipLineEdit.setValidator(QRegularExpressionValidator(
             QRegularExpression(r"((2(5[0-5]|[0-4]\d))|[0-1]?\d{1,2})(\.((2(5[0-5]|[0-4]\d))|[0-1]?\d{1,2})){3}"), self))
         hLayout.addWidget(self.ipLineEdit)
@@ -224,30 +279,35 @@ class RBKVersionValidator(QWidget):
 
 
     def slotLoadVersionSheetButtonClicked(self):
+        if self.sheetThread.isRunning():
+            return
         self.model.clear()
-        xlsx = cfg[self.__class__.__name__, "rbk_version_excel"]
-        if not xlsx:
-            xlsx = RBKVersionValidator.META["config"]["rbk_version_excel"]["value"]
+        self.sheet = None
+        self.matcher = None
+        xlsx = versionSheetPath()
         if not os.path.exists(xlsx):
             printLog(f"没有找到版本配置表 {xlsx}")
             return
-        try:
-            wb = load_workbook(xlsx)
-            ws: Worksheet = wb.active
-            self.srcTypeList = [ws.cell(1, column).value for column in range(1, ws.max_column + 1)]
-            self.model.setHorizontalHeaderLabels(self.srcTypeList)
-            for row in range(2, 7):
-                self.model.appendRow([QStandardItem(ws.cell(row, column).value) for column in range(1, ws.max_column + 1)])
-            width = 1.0 / 5.0 * self.tableView.width()
-            self.tableView.setColumnWidth(0, width)
-            self.tableView.setColumnWidth(1, width)
-            self.tableView.setColumnWidth(2, width)
-            self.tableView.setColumnWidth(3, width)
-            self.tableView.setColumnWidth(4, width)
-            wb.close()
-        except:
-            printLog(f"读取版本配置表失败 {xlsx}")
+        self.loadVersionSheetButton.setEnabled(False)
+        self.sheetThread.xlsx = xlsx
+        self.sheetThread.start()
+
+    def slotSheetThreadFinished(self):
+        self.loadVersionSheetButton.setEnabled(True)
+        if self.sheetThread.sheet is None:
+            printLog(f"读取版本配置表失败 {self.sheetThread.xlsx} {self.sheetThread.error}")
             return
+        self.sheet = self.sheetThread.sheet
+        self.matcher = self.sheetThread.matcher
+        self.model.setHorizontalHeaderLabels(self.sheet.srcTypeList)
+        for row in self.sheet.rows:
+            self.model.appendRow([QStandardItem(v) for v in row])
+        width = 1.0 / 5.0 * self.tableView.width()
+        self.tableView.setColumnWidth(0, width)
+        self.tableView.setColumnWidth(1, width)
+        self.tableView.setColumnWidth(2, width)
+        self.tableView.setColumnWidth(3, width)
+        self.tableView.setColumnWidth(4, width)
         printLog(f"加载版本配置表成功！")
 
     def slotValidateButtonClicked(self):
@@ -267,29 +327,18 @@ class RBKVersionValidator(QWidget):
         self.l52.setText(self.workThread.gyroVersion)
 
         self.srcTitle.setText(self.workThread.srcName)
-        for i, t in enumerate(self.srcTypeList):
-            if t and t.upper() == self.workThread.srcName.upper():
-                self.l11.setText(self.model.index(0, i).data(Qt.ItemDataRole.DisplayRole))
-                self.l21.setText(self.model.index(1, i).data(Qt.ItemDataRole.DisplayRole))
-                self.l31.setText(self.model.index(2, i).data(Qt.ItemDataRole.DisplayRole))
-                self.l41.setText(self.model.index(3, i).data(Qt.ItemDataRole.DisplayRole))
-                self.l51.setText(self.model.index(4, i).data(Qt.ItemDataRole.DisplayRole))
-                break
-        else:
+        if self.matcher is None or self.matcher.rulesFor(self.workThread.srcName) is None:
             printLog(self.workThread.srcName, "Error")
-            self.l11.setText("")
-            self.l21.setText("")
-            self.l31.setText("")
-            self.l41.setText("")
-            self.l51.setText("")
-
-        self.r13.value = self.l11.text() == self.l12.text() if self.l11.text() and self.l12.text() else False
-        self.r23.value = self.l21.text() == self.l22.text() if self.l21.text() and self.l22.text() else False
-        self.r33.value = self.l31.text() == self.l32.text() if self.l31.text() and self.l32.text() else False
-        self.r43.value = self.l41.text() == self.l42.text() if self.l41.text() and self.l42.text() else False
-        self.r53.value = self.l51.text() == self.l52.text() if self.l51.text() and self.l52.text() else False
-
-        result = self.r13.value and self.r23.value and self.r33.value and self.r43.value and self.r53.value
+        res = validate(self.workThread, self.matcher) if self.matcher is not None else None
+        labels = [self.l11, self.l21, self.l31, self.l41, self.l51]
+        icons = [self.r13, self.r23, self.r33, self.r43, self.r53]
+        for name, label, icon in zip(VERSION_ITEMS, labels, icons):
+            item = res["items"][name] if res is not None else {"expected": "", "ok": False}
+            label.setText(item["expected"])
+            icon.value = item["ok"]
+            icon.update()
+
+        result = res is not None and res["ok"]
         printLog(f"验证结果:{'OK' if result else 'NG'}")
         s = '<b style="color: green;">OK</b>' if result else '<b style="color: red;">NG</b>'
         self.resultLabel.setText(f'<b>验证结果：</b>{s}')
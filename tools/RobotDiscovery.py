@@ -0,0 +1,166 @@
+import asyncio
+import time
+
+from PySide6.QtCore import Qt, QThread, Signal, QStringListModel
+from PySide6.QtGui import QStandardItemModel, QStandardItem
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableView, QLineEdit, \
+    QSpinBox, QCompleter
+
+from init import cfg, printLog
+from lib.IPUtils import parseTargets
+from lib.RobotDiscovery import discover, registry
+
+DEFAULT_IP = "192.168.192.5"
+ROBOT_COLUMNS = [("ip", "IP"), ("id", "机器人 ID"), ("srcName", "SRC"), ("rbkVersion", "Robokit"),
+                 ("robodVersion", "Robod"), ("dspVersion", "DSP"), ("gyroVersion", "GYRO")]
+
+
+class RobotListModel(QStringListModel):
+    """
+    已发现机器人的 IP 列表，所有工具的 IP 输入框共用，registry 更新时在主线程刷新
+    """
+    sigUpdated = Signal(object)
+
+    def __init__(self):
+        super().__init__(registry.ips())
+        self.sigUpdated.connect(self.slotUpdated, Qt.ConnectionType.QueuedConnection)
+        registry.subscribe(self.sigUpdated.emit)
+
+    def slotUpdated(self, info):
+        if info["ip"] not in self.stringList():
+            self.setStringList(registry.ips())
+
+
+__robotListModel__ = None
+
+
+def robotListModel():
+    global __robotListModel__
+    if __robotListModel__ is None:
+        __robotListModel__ = RobotListModel()
+    return __robotListModel__
+
+
+def defaultIp():
+    """
+    IP 输入框的初始值：第一台已发现的机器人，还没有扫描时使用出厂默认 IP
+    """
+    ips = registry.ips()
+    return ips[0] if ips else DEFAULT_IP
+
+
+def attachRobotCompleter(lineEdit: QLineEdit):
+    """
+    为 IP 输入框加上已发现机器人的自动补全
+    """
+    completer = QCompleter(robotListModel(), lineEdit)
+    lineEdit.setCompleter(completer)
+    return completer
+
+
+class DiscoveryThread(QThread):
+    sigFound = Signal(object)
+
+    def __init__(self):
+        super().__init__()
+        self.ips = []
+        self.concurrency = 512
+        self.found = []
+
+    def onFound(self, info):
+        registry.update(info)
+        self.sigFound.emit(info)
+
+    def run(self):
+        printLog(f"扫描 {len(self.ips)} 个 IP，并发 {self.concurrency}")
+        start = time.monotonic()
+        try:
+            self.found = asyncio.run(discover(self.ips, self.concurrency, self.onFound))
+        except Exception as e:
+            printLog("扫描失败", e)
+            return
+        printLog(f"扫描完成 发现 {len(self.found)} 台机器人，耗时 {time.monotonic() - start:.1f} 秒")
+
+
+class RobotDiscovery(QWidget):
+    META = {
+        "title": "发现机器人"
+    }
+
+    def __init__(self):
+        super().__init__()
+
+        self.workThread = DiscoveryThread()
+        self.model = QStandardItemModel()
+        self.initUI()
+
+        for info in registry.list():
+            self.slotFound(info)
+        self.workThread.sigFound.connect(self.slotFound)
+        self.workThread.finished.connect(self.slotWorkThreadFinished)
+
+    def initUI(self):
+        layout = QVBoxLayout(self)
+
+        hLayout = QHBoxLayout()
+        layout.addLayout(hLayout)
+        hLayout.addWidget(QLabel("网段:"))
+        self.targetsLineEdit = QLineEdit(cfg[self.__class__.__name__, "targets"] or "192.168.192.0/24")
+        self.targetsLineEdit.setPlaceholderText("IP / CIDR / 范围，多个用逗号分隔")
+        hLayout.addWidget(self.targetsLineEdit)
+        hLayout.addWidget(QLabel("并发数:"))
+        self.concurrencySpinBox = QSpinBox()
+        self.concurrencySpinBox.setRange(1, 4096)
+        try:
+            self.concurrencySpinBox.setValue(int(cfg[self.__class__.__name__, "concurrency"]))
+        except:
+            self.concurrencySpinBox.setValue(512)
+        hLayout.addWidget(self.concurrencySpinBox)
+        self.startButton = QPushButton("扫描")
+        hLayout.addWidget(self.startButton)
+
+        self.summaryLabel = QLabel()
+        layout.addWidget(self.summaryLabel)
+
+        self.model.setHorizontalHeaderLabels([label for _, label in ROBOT_COLUMNS])
+        self.tableView = QTableView()
+        self.tableView.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
+        self.tableView.setSortingEnabled(True)
+        self.tableView.setModel(self.model)
+        layout.addWidget(self.tableView)
+
+        self.startButton.clicked.connect(self.slotStartButtonClicked)
+
+    def slotStartButtonClicked(self):
+        text = self.targetsLineEdit.text()
+        try:
+            ips = parseTargets(text)
+        except Exception as e:
+            printLog("网段格式错误：", e)
+            return
+        if not ips:
+            printLog("没有需要扫描的 IP")
+            return
+        concurrency = self.concurrencySpinBox.value()
+        if cfg[self.__class__.__name__, "targets"] != text:
+            cfg[self.__class__.__name__, "targets"] = text
+        if cfg[self.__class__.__name__, "concurrency"] != str(concurrency):
+            cfg[self.__class__.__name__, "concurrency"] = concurrency
+        self.startButton.setDisabled(True)
+        self.summaryLabel.setText(f"正在扫描 {len(ips)} 个 IP")
+        self.workThread.ips = ips
+        self.workThread.concurrency = concurrency
+        self.workThread.start()
+
+    def slotFound(self, info):
+        items = [QStandardItem(str(info.get(key, ""))) for key, _ in ROBOT_COLUMNS]
+        found = self.model.findItems(info["ip"], Qt.MatchFlag.MatchExactly, 0)
+        if found:
+            for column, item in enumerate(items):
+                self.model.setItem(found[0].row(), column, item)
+        else:
+            self.model.appendRow(items)
+
+    def slotWorkThreadFinished(self):
+        self.startButton.setEnabled(True)
+        self.summaryLabel.setText(f"本次发现 {len(self.workThread.found)} 台，共 {len(registry.robots)} 台")
@@ -1,17 +1,35 @@
-import json
 import os
-import socket
+import random
+import time
+from contextlib import ExitStack, nullcontext
 
-from PySide6.QtCore import QDir, QRegularExpression, Qt, QThread
+from PySide6.QtCore import QDir, QRegularExpression, Qt, QThread, Signal
 from PySide6.QtGui import QRegularExpressionValidator, QStandardItemModel, QStandardItem, QPainter, QPen, QColor, \
     QPainterPath
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QListView
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QListView, \
+    QCheckBox
 
 from init import cfg, printLog
+from lib.ConnectionPool import pool
+from lib.DeltaPackage import deltaCache
+from lib.FrameDecoder import FrameDecoder
+from lib.PackageCatalog import PackageCatalog, extractMetadata, installedVersions, isInstalled
+from lib.PackageStore import store
 from lib.RBKUtils import RBKUtils
-
-
-class Thread(QThread):
+from lib.TransferMeter import TransferMeter, formatTransfer
+from tools.RobotDiscovery import defaultIp, attachRobotCompleter
+
+
+class Upgrader:
+    """
+    升级一台机器人，单台升级和批量升级共用
+    onStatus(ip, text) 在升级阶段变化时调用
+    onTransfer(ip, snapshot) 在上传过程中调用，snapshot 为 TransferMeter.snapshot()，间隔不小于 0.2 秒
+    scheduler 为 BandwidthScheduler 时，上传前等待带宽余量，上传过程中按令牌桶限速
+    skipCurrent 为 True 时先比较机器人版本和升级包信息（packageInfo，缺省从包中读取），已是目标版本则不上传
+    catalog 为 PackageCatalog 时，按机器人当前版本从目录中找基准包，改为上传更小的增量包
+    升级包上传完成前连接中断时，按指数退避最多重试 retries 次
+    """
     upgradeStatusDict = {
         "0": "设备正在接收升级文件…",
         "1": "接收完成，正在解压文件…",
@@ -38,136 +56,373 @@ class Thread(QThread):
         "9": "恢复 辅助程序…"
     }
 
-    def __init__(self):
-        super().__init__()
-        self.ip = "192.168.192.5"
-        self.filePath = ""
+    def __init__(self, ip, filePath, onStatus=None, scheduler=None, packageInfo=None, skipCurrent=False,
+                 catalog: PackageCatalog = None, onTransfer=None, retries=3):
+        self.ip = ip
+        self.filePath = filePath
+        self.onStatus = onStatus
+        self.scheduler = scheduler
+        self.packageInfo = packageInfo
+        self.skipCurrent = skipCurrent
+        self.catalog = catalog
+        self.onTransfer = onTransfer
+        self.status = ""
+        self.sentBytes = 0
+        self.meter: TransferMeter = None
+        self.lastReport = 0.0
+        self.lastLog = 0.0
+        self.phase = ""
+        self.phaseStart = 0.0
+        self.phases = []  # [(阶段, 秒), ...]
+        self.retries = retries
+        self.backoffBase = 2.0
+        self.maxBackoff = 60.0
+        self.ioTimeout = 120
+        self.uploaded = False  # 机器人已确认收到升级包
+        self.retryable = False  # 失败原因是上传完成前的网络中断，可以重新排队
+
+        self.updateState = 0  # 0: 1:成功 2:失败 3:已是目标版本，跳过
+
+    def setStatus(self, text):
+        self.status = text
+        printLog(f"{text} {self.ip}")
+        if self.onStatus is not None:
+            self.onStatus(self.ip, text)
+
+    def setPhase(self, text):
+        """
+        开始一个新的阶段，记录上一个阶段的用时
+        """
+        if text == self.phase:
+            return
+        self.endPhase()
+        self.phase = text
+        self.phaseStart = time.monotonic()
+        self.setStatus(text)
 
-        self.updateState = 0  # 0: 1:成功 2:失败
+    def endPhase(self):
+        if not self.phase:
+            return
+        elapsed = time.monotonic() - self.phaseStart
+        self.phases.append((self.phase, elapsed))
+        printLog(f"{self.phase} 用时 {elapsed:.1f} 秒 {self.ip}")
+        self.phase = ""
 
     def run(self):
         self.updateState = 0
+        self.phases = []
         if not os.path.exists(self.filePath):
             printLog(f"文件不存在 {self.filePath}")
-            return
-
-        with open(self.filePath, "rb") as f:
-            zipData = f.read()
-
-        try:
-            printLog(f"连接 {self.ip}:19208")
-            so: socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            so.connect((self.ip, 19208))
-            # so.settimeout(60)
-            printLog("查询 Robod 版本")
+            self.updateState = 2
+            self.setStatus("文件不存在")
+            return self.updateState
+
+        for attempt in range(self.retries + 1):
+            self.updateState = 0
+            self.uploaded = False
+            try:
+                self.attempt()
+                break
+            except Exception as e:
+                printLog("Exception:,", e)
+                self.endPhase()
+                self.updateState = 2
+                # 只有升级包还没被机器人接收时才自动重试，之后断开说明机器人可能正在更新或重启
+                self.retryable = isinstance(e, OSError) and not self.uploaded
+                if not self.retryable or attempt == self.retries:
+                    self.setStatus(f"升级失败：{e}")
+                    break
+                wait = self.backoff(attempt)
+                self.setStatus(f"连接中断，{wait:.1f} 秒后重试（{attempt + 1}/{self.retries}）：{e}")
+                time.sleep(wait)
+        if self.phases:
+            printLog(f"阶段用时 {self.ip}: " + "，".join(f"{p} {t:.1f}s" for p, t in self.phases))
+        return self.updateState
+
+    def backoff(self, attempt):
+        """
+        指数退避加随机抖动，避免一批机器人同时重连
+        """
+        return min(self.maxBackoff, self.backoffBase * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+    def attempt(self):
+        """
+        完整的一次升级，传输失败时抛出 OSError
+        RBK 协议不支持断点续传，重试时从头上传
+        """
+        self.retryable = False
+        self.setStatus("连接")
+        statusInfo = self.queryStatusInfo() if self.skipCurrent or self.catalog is not None else None
+        printLog("查询 Robod 版本")
+        with pool.connection(self.ip, 19208) as so:
             _, data = RBKUtils.request(so, 5041)
-            version_info: dict = json.loads(data)
-            vs = version_info.get("version").split(".")
-
-            printLog(f"上传升级包 {self.filePath} {self.ip}")
-            if int(vs[0]) >= 5:
-                js = {
-                    "type": "upgradeSRC",
-                    "fileName": "upgrade_pkg.zip"
-                }
-                RBKUtils.request(so, 5136, js, zipData)
-            else:
-                RBKUtils.request(so, 5104, None, zipData)
-            printLog(f"升级包上传成功 {self.ip}")
-
-            recvData = b''
-            while True:
-                while True:
-                    # 接收报文头
-                    l = 16 - len(recvData)
-                    if l > 0:
-                        recvData += so.recv(l)
-                    # 解析报文头
-                    print(recvData)
-                    try:
-                        header = RBKUtils.unpack(recvData)
-                    except:
-                        recvData = recvData[1:]
-                        continue
-                    if header[0] == 0x5A and header[1] == 0x01:
-                        recvData = recvData[16:]
-                        break
-                    recvData = recvData[1:]
-                # 获取报文体长度
-                bodyLen = header[3]
-                readSize = 1024
-                while (bodyLen > 0):
-                    recv = so.recv(readSize)
-                    recvData += recv
-                    bodyLen -= len(recv)
-                    if bodyLen < readSize:
-                        readSize = bodyLen
-                print(header[4])
-                if header[4] == 15125:
-                    try:
-                        js = json.loads(recvData[header[6]:header[3]])
-                    except:
-                        printLog(str(recvData[header[6]:header[3]]))
-                    else:
-                        reductionStatus = js.get("reductionStatus", "")
-                        upgradeStatus = js.get("upgradeStatus", "")
-                        if upgradeStatus:
-                            printLog(Thread.upgradeStatusDict.get(upgradeStatus, upgradeStatus).rstrip())
-                        elif reductionStatus:
-                            printLog(Thread.reductionStatusDict.get(reductionStatus, reductionStatus).rstrip())
-                elif header[4] == 15136:
-                    try:
-                        js = json.loads(recvData[:header[6]])
-                        if "err_msg" in js:
-                            try:
-                                js = json.loads(recvData[header[6]:header[3]])
-                            except:
-                                printLog(str(recvData[header[6]:header[3]]))
-                            else:
-                                printLog(js)
-                            printLog()
-                            printLog(f"升级失败 {self.ip}")
-                            printLog(f"关闭连接 {self.ip}:19208")
-                            so.close()
-                            self.updateState = 2
-                            break
-                        else:
-                            printLog(f"升级完成 {self.ip}")
-                            printLog(f"关闭连接 {self.ip}:19208")
-                            so.close()
-                            self.updateState = 1
-                            break
-                    except:
-                        printLog(str(recvData[:header[6]]))
+        version_info: dict = RBKUtils.lazy(data)
+        vs = version_info.get("version").split(".")
+        if self.skipCurrent and self.isCurrent(statusInfo, version_info):
+            self.updateState = 3
+            self.setStatus("已是目标版本，跳过（未上传）")
+            return
+        uploadPath = self.choosePackage(statusInfo, version_info)
+
+        if self.scheduler is not None:
+            self.setStatus("等待上传带宽")
+        admit = self.scheduler.admit(self.ip) if self.scheduler is not None else nullcontext()
+        with ExitStack() as stack:
+            with admit:
+                # 获得上传带宽后才建立升级连接，排队期间不占用连接
+                # 升级过程中机器人断开或重启，连接不再复用
+                so = stack.enter_context(pool.connection(self.ip, 19208, False))
+                # 上传时设置超时，网络中断能及时发现
+                so.settimeout(self.ioTimeout)
+                # 同一个升级包只映射一次，所有并发上传共用同一块只读内存
+                with store.open(uploadPath) as buf:
+                    if uploadPath == self.filePath:
+                        self.setPhase(f"上传升级包 {os.path.basename(self.filePath)}")
                     else:
-                        printLog(js)
-
-                elif header[4] == 15104:
-                    if header[3] == 0:
-                        printLog(f"升级完成 {self.ip}")
-                        printLog(f"关闭连接 {self.ip}:19208")
-                        so.close()
-                        self.updateState = 1
-                        break
+                        self.setPhase(f"上传增量包 {os.path.basename(uploadPath)}")
+                    self.sentBytes = 0
+                    self.meter = TransferMeter(buf.size)
+                    self.lastReport = self.lastLog = 0.0
+                    if int(vs[0]) >= 5:
+                        js = {
+                            "type": "upgradeSRC",
+                            "fileName": "upgrade_pkg.zip"
+                        }
+                        RBKUtils.requestView(so, 5136, js, buf.view, chunkSize=self.chunkSize(), onProgress=self.onProgress)
                     else:
-                        try:
-                            js = json.loads(recvData[header[6]:header[3]])
-                        except:
-                            printLog(str(recvData[header[6]:header[3]]))
-                        else:
-                            printLog(js)
-                        printLog(f"升级失败 {self.ip}")
-                        printLog(f"关闭连接 {self.ip}:19208")
-                        so.close()
-                        self.updateState = 2
+                        RBKUtils.requestView(so, 5104, None, buf.view, chunkSize=self.chunkSize(), onProgress=self.onProgress)
+            self.uploaded = True
+            self.endPhase()
+            printLog(f"上传统计 {self.ip} {self.meter.text()} 用时 {self.meter.elapsed:.1f} 秒")
+            self.setStatus("升级包上传成功")
+
+            # 解压、更新的耗时不确定，不设置超时
+            so.settimeout(None)
+            decoder = FrameDecoder()
+            while self.updateState == 0:
+                recv = so.recv(65536)
+                if not recv:
+                    raise ConnectionError("连接已断开")
+                for header, jsonData, data in decoder.feed(recv):
+                    self.handleFrame(header, jsonData, data)
+                    if self.updateState != 0:
                         break
-                else:
-                    printLog(header[4], str(recvData[header[6]:header[3]]))
-                recvData = recvData[header[3]:]
+            printLog(f"关闭连接 {self.ip}:19208")
+
+    def queryStatusInfo(self):
+        """
+        查询 1000 机器人信息，失败时返回 None，不影响升级
+        """
+        try:
+            with pool.connection(self.ip, 19204) as so:
+                _, data = RBKUtils.request(so, 1000)
+            return RBKUtils.lazy(data)
         except Exception as e:
-            printLog("Exception:,", e)
-            self.updateState = 2
-            return
+            printLog(f"查询机器人信息失败 {self.ip}:", e)
+            return None
+
+    def isCurrent(self, statusInfo, robodInfo):
+        if self.packageInfo is None:
+            self.packageInfo = extractMetadata(self.filePath)
+        installed = installedVersions(statusInfo, robodInfo)
+        current = isInstalled(self.packageInfo, installed)
+        printLog(f"版本比较 {self.ip} 机器人 {installed} 升级包 {self.packageInfo.get('version')} "
+                 f"{self.packageInfo.get('manifestComponents')} {'一致' if current else '不一致'}")
+        return current
+
+    def choosePackage(self, statusInfo, robodInfo):
+        """
+        有可用的增量包时返回增量包路径，否则返回完整包路径
+        """
+        if self.catalog is None or statusInfo is None:
+            return self.filePath
+        target = self.catalog.get(self.filePath)
+        if target is None:
+            return self.filePath
+        try:
+            path, baseline = deltaCache(self.catalog.directory).choose(
+                target, installedVersions(statusInfo, robodInfo), self.catalog.list())
+        except Exception as e:
+            printLog(f"生成增量包失败 {self.ip}:", e)
+            return self.filePath
+        if baseline is not None:
+            printLog(f"使用增量包 {self.ip} 基准 {baseline['name']} {os.path.getsize(path)} / {target['size']} 字节")
+        return path
+
+    def chunkSize(self):
+        # 限速时用较小的块，速率更平滑
+        return 1 << 20 if self.scheduler is None else 256 << 10
+
+    def onProgress(self, sent, total):
+        n = sent - self.sentBytes
+        self.sentBytes = sent
+        self.meter.update(sent)
+        now = time.monotonic()
+        if self.onTransfer is not None and (now - self.lastReport >= 0.2 or sent >= total):
+            self.lastReport = now
+            self.onTransfer(self.ip, self.meter.snapshot())
+        if now - self.lastLog >= 5:
+            self.lastLog = now
+            printLog(f"上传 {self.ip} {self.meter.text()}")
+        if self.scheduler is not None:
+            self.scheduler.throttle(self.ip, n)
+
+    def handleFrame(self, header, jsonData, data):
+        """
+        处理升级过程中机器人推送的报文，升级结束时设置 updateState
+        """
+        if header[4] == 15125:
+            try:
+                js = RBKUtils.loads(data)
+            except:
+                printLog(str(bytes(data)))
+            else:
+                reductionStatus = js.get("reductionStatus", "")
+                upgradeStatus = js.get("upgradeStatus", "")
+                if upgradeStatus:
+                    self.setPhase(Upgrader.upgradeStatusDict.get(upgradeStatus, upgradeStatus).rstrip())
+                elif reductionStatus:
+                    self.setPhase(Upgrader.reductionStatusDict.get(reductionStatus, reductionStatus).rstrip())
+        elif header[4] == 15136:
+            try:
+                js = RBKUtils.loads(jsonData)
+            except:
+                printLog(str(bytes(jsonData)))
+                return
+            if "err_msg" in js:
+                try:
+                    printLog(RBKUtils.loads(data))
+                except:
+                    printLog(str(bytes(data)))
+                self.endPhase()
+                self.updateState = 2
+                self.setStatus("升级失败")
+            else:
+                self.endPhase()
+                self.updateState = 1
+                self.setStatus("升级完成")
+        elif header[4] == 15104:
+            if header[3] == 0:
+                self.endPhase()
+                self.updateState = 1
+                self.setStatus("升级完成")
+            else:
+                try:
+                    printLog(RBKUtils.loads(data))
+                except:
+                    printLog(str(bytes(data)))
+                self.endPhase()
+                self.updateState = 2
+                self.setStatus("升级失败")
+        else:
+            printLog(header[4], str(bytes(data)))
+
+
+class Thread(QThread):
+    sigStatus = Signal(str)
+    sigTransfer = Signal(object)  # TransferMeter.snapshot()
+
+    def __init__(self):
+        super().__init__()
+        self.ip = "192.168.192.5"
+        self.filePath = ""
+        self.packageInfo = None
+        self.skipCurrent = False
+        self.catalog: PackageCatalog = None
+
+        self.updateState = 0  # 0: 1:成功 2:失败 3:已是目标版本，跳过
+
+    def run(self):
+        self.updateState = Upgrader(self.ip, self.filePath, lambda ip, text: self.sigStatus.emit(text),
+                                    packageInfo=self.packageInfo, skipCurrent=self.skipCurrent, catalog=self.catalog,
+                                    onTransfer=lambda ip, snapshot: self.sigTransfer.emit(snapshot)).run()
+
+
+def packageDirectory():
+    rbkDir = cfg[UpgradeRBK.__name__, "rbk_package_directory"]
+    if not rbkDir:
+        rbkDir = UpgradeRBK.META["config"]["rbk_package_directory"]["value"]
+    if not os.path.exists(rbkDir):
+        os.makedirs(rbkDir)
+    return rbkDir
+
+
+__catalogs__ = {}
+
+
+def packageCatalog() -> PackageCatalog:
+    rbkDir = packageDirectory()
+    if rbkDir not in __catalogs__:
+        __catalogs__[rbkDir] = PackageCatalog(rbkDir)
+    return __catalogs__[rbkDir]
+
+
+def packageItem(entry: dict, duplicates: set = None):
+    """
+    升级包列表中的一项，显示版本和 SRC 类型
+    """
+    text = entry["name"]
+    tags = [t for t in (entry.get("version"), entry.get("srcType")) if t]
+    if tags:
+        text += f"    [{' | '.join(tags)}]"
+    if duplicates and entry["name"] in duplicates:
+        text += "    (重复)"
+    item = QStandardItem(text)
+    item.setData(entry["path"], Qt.ItemDataRole.UserRole)
+    components = "\n".join(f"{k}: {v}" for k, v in entry.get("components", {}).items())
+    item.setToolTip(f"大小：{entry['size'] / 1024 / 1024:.1f} MB\nSHA-256：{entry['sha256']}" +
+                    (f"\n{components}" if components else ""))
+    return item
+
+
+class CatalogThread(QThread):
+    """
+    在后台刷新升级包索引，只有新增或修改过的包需要计算哈希
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.catalog: PackageCatalog = None
+
+    def run(self):
+        self.catalog = packageCatalog()
+        self.catalog.refresh(lambda name: printLog(f"索引升级包 {name}"))
+
+
+def fillPackageModel(model: QStandardItemModel, catalog: PackageCatalog, text=""):
+    model.clear()
+    if catalog is None:
+        return
+    duplicates = set()
+    for names in catalog.duplicates().values():
+        duplicates.update(names)
+    for entry in catalog.search(text):
+        model.appendRow(packageItem(entry, duplicates))
+
+
+UPGRADE_OPTIONS = {  # 键: (文字, 提示, 默认是否勾选)
+    "skip_current": ("跳过已是该版本的机器人",
+                     "上传前比较机器人版本（1000 / 5041）与升级包清单中的组件版本，全部完全一致则不上传", False),
+    "use_delta": ("使用增量包", "机器人正在运行目录中的某个升级包时，只上传与目标包不同的文件", False)
+}
+
+
+def optionCheckBox(section, key, default=None):
+    """
+    升级选项复选框，状态保存在配置文件中，没有保存过时使用 default（缺省为 UPGRADE_OPTIONS 中的默认值）
+    """
+    text, tip, optionDefault = UPGRADE_OPTIONS[key]
+    w = QCheckBox(text)
+    w.setToolTip(tip)
+    value = cfg[section, key]
+    w.setChecked(value == "True" if value is not None else optionDefault if default is None else default)
+    return w
+
+
+def saveOption(section, key, w: QCheckBox):
+    if cfg[section, key] != str(w.isChecked()):
+        cfg[section, key] = w.isChecked()
+    return w.isChecked()
 
 
 class Progress(QWidget):
@@ -177,13 +432,19 @@ class Progress(QWidget):
         self.setMinimumSize(10, 10)
 
         self.updateState = 0
+        self.fraction = -1.0  # 0~1 时按比例显示进度，小于 0 时为转圈
 
         self.timeID = -1
         self.startAngle = 0
         self.angleSpan = 0
         self.step = 10
 
+    def setFraction(self, fraction):
+        self.fraction = fraction
+        self.update()
+
     def start(self):
+        self.fraction = -1.0
         if self.timeID != -1:
             self.killTimer(self.timeID)
         self.timeID = self.startTimer(33)
@@ -222,6 +483,10 @@ class Progress(QWidget):
                 painter.setPen(QPen(QColor(25, 200, 25, 255), 4, Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap,
                                     Qt.PenJoinStyle.RoundJoin))
                 painter.drawPath(path)
+            elif self.updateState == 3:
+                # 跳过：没有上传，画一条横线，与成功区分
+                painter.setPen(QPen(QColor(220, 140, 0, 255), 4, Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap))
+                painter.drawLine(self.width() * 0.2, self.height() * 0.5, self.width() * 0.8, self.height() * 0.5)
             elif self.updateState == 2:
                 painter.setPen(QPen(QColor(200, 25, 25, 255), 4, Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap,
                                     Qt.PenJoinStyle.RoundJoin))
@@ -229,6 +494,13 @@ class Progress(QWidget):
                 painter.drawLine(self.width() * 0.2, self.height() * 0.8, self.width() * 0.8, self.height() * 0.2)
             return
 
+        if self.fraction >= 0:
+            painter.setPen(QPen(QColor(200, 200, 200, 255), 4))
+            painter.drawEllipse(2, 2, self.width() - 4, self.height() - 4)
+            painter.setPen(QPen(QColor(25, 25, 200, 255), 4, Qt.PenStyle.SolidLine, Qt.PenCapStyle.FlatCap))
+            painter.drawArc(2, 2, self.width() - 4, self.height() - 4, 90 * 16, int(-self.fraction * 360 * 16))
+            return
+
         painter.setPen(QPen(QColor(25, 25, 200, 255), 4, Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap,
                             Qt.PenJoinStyle.RoundJoin))
 
@@ -252,10 +524,15 @@ class UpgradeRBK(QWidget):
         super().__init__()
 
         self.workThread = Thread()
+        self.catalogThread = CatalogThread()
         self.model = QStandardItemModel()
         self.initUI()
 
         self.workThread.finished.connect(self.slotWorkThreadFinished)
+        self.workThread.sigStatus.connect(self.slotStatus)
+        self.workThread.sigTransfer.connect(self.slotTransfer)
+        self.catalogThread.finished.connect(self.slotCatalogRefreshed)
+        self.refreshButton.click()
 
     def initUI(self):
         layout = QVBoxLayout(self)
@@ -263,7 +540,8 @@ class UpgradeRBK(QWidget):
         hLayout = QHBoxLayout()
         layout.addLayout(hLayout)
         hLayout.addWidget(QLabel("IP:"))
-        self.ipLineEdit = QLineEdit("192.168.192.5")
+        self.ipLineEdit = QLineEdit(defaultIp())
+        attachRobotCompleter(self.ipLineEdit)
         self.ipLineEdit.setValidator(QRegularExpressionValidator(
             QRegularExpression(r"((2(5[0-5]|[0-4]\d))|[0-1]?\d{1,2})(\.((2(5[0-5]|[0-4]\d))|[0-1]?\d{1,2})){3}"), self))
         hLayout.addWidget(self.ipLineEdit)
@@ -271,33 +549,43 @@ class UpgradeRBK(QWidget):
         hLayout.addWidget(self.progress)
         self.refreshButton = QPushButton("刷新文件列表")
         hLayout.addWidget(self.refreshButton)
+        self.skipCurrentCheckBox = optionCheckBox(self.__class__.__name__, "skip_current")
+        hLayout.addWidget(self.skipCurrentCheckBox)
+        self.useDeltaCheckBox = optionCheckBox(self.__class__.__name__, "use_delta")
+        hLayout.addWidget(self.useDeltaCheckBox)
         self.startUpgradeButton = QPushButton("开始升级")
         hLayout.addWidget(self.startUpgradeButton)
         self.refreshButton.adjustSize()
         self.progress.setFixedSize(self.refreshButton.height(), self.refreshButton.height())
 
+        self.transferLabel = QLabel()
+        layout.addWidget(self.transferLabel)
+
+        self.searchLineEdit = QLineEdit()
+        self.searchLineEdit.setPlaceholderText("按版本 / SRC 类型 / 文件名搜索")
+        self.searchLineEdit.setClearButtonEnabled(True)
+        layout.addWidget(self.searchLineEdit)
+
         self.filesListView = QListView()
         self.filesListView.setModel(self.model)
         layout.addWidget(self.filesListView)
 
         self.refreshButton.clicked.connect(self.slotRefreshButtonClicked)
         self.startUpgradeButton.clicked.connect(self.slotStartUpgradeButtonClicked)
-        self.refreshButton.click()
+        self.searchLineEdit.textChanged.connect(self.slotSearchTextChanged)
 
     def slotRefreshButtonClicked(self):
-        self.model.clear()
-        rbkDir = cfg[self.__class__.__name__, "rbk_package_directory"]
-        if not rbkDir:
-            rbkDir = UpgradeRBK.META["config"]["rbk_package_directory"]["value"]
-
-        if (not os.path.exists(rbkDir)):
-            os.makedirs(rbkDir)
-        for f in os.listdir(rbkDir):
-            path = os.path.join(rbkDir, f)
-            if os.path.isfile(path) and path[-4:] == ".zip":
-                item = QStandardItem(os.path.basename(f))
-                item.setData(path, Qt.ItemDataRole.UserRole)
-                self.model.appendRow(item)
+        if self.catalogThread.isRunning():
+            return
+        self.refreshButton.setDisabled(True)
+        self.catalogThread.start()
+
+    def slotCatalogRefreshed(self):
+        self.refreshButton.setEnabled(True)
+        self.slotSearchTextChanged(self.searchLineEdit.text())
+
+    def slotSearchTextChanged(self, text):
+        fillPackageModel(self.model, self.catalogThread.catalog, text)
         self.filesListView.setCurrentIndex(self.model.index(0, 0))
 
     def slotStartUpgradeButtonClicked(self):
@@ -309,8 +597,20 @@ class UpgradeRBK(QWidget):
         self.progress.start()
         self.workThread.ip = self.ipLineEdit.text()
         self.workThread.filePath = filePath
+        catalog = self.catalogThread.catalog
+        self.workThread.skipCurrent = saveOption(self.__class__.__name__, "skip_current", self.skipCurrentCheckBox)
+        self.workThread.packageInfo = catalog.get(filePath) if catalog else None
+        self.workThread.catalog = catalog if saveOption(self.__class__.__name__, "use_delta", self.useDeltaCheckBox) else None
         self.workThread.start()
 
+    def slotStatus(self, text):
+        self.transferLabel.setText(text)
+
+    def slotTransfer(self, snapshot):
+        self.transferLabel.setText(formatTransfer(snapshot))
+        # 上传结束后机器人解压、更新的进度未知，恢复转圈
+        self.progress.setFraction(snapshot["sent"] / snapshot["total"] if snapshot["sent"] < snapshot["total"] else -1)
+
     def slotWorkThreadFinished(self):
         self.startUpgradeButton.setEnabled(True)
         self.progress.updateState = self.workThread.updateState
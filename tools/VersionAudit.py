@@ -0,0 +1,220 @@
+import csv
+import ipaddress
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtCore import Qt, QThread, Signal
+from PySide6.QtGui import QStandardItemModel, QStandardItem, QColor
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableView, QPlainTextEdit, \
+    QSpinBox, QSplitter, QFileDialog
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill
+
+from init import cfg, printLog
+from lib.IPUtils import parseTargets
+from lib.VersionSheet import VersionSheet
+from tools.RBKVersionValidator import VERSION_ITEMS, VERSION_LABELS, auditRobot, versionMatcher, versionSheetPath
+
+
+def reportHeader():
+    header = ["IP", "SRC"]
+    for label in VERSION_LABELS:
+        header += [f"{label} 期望", f"{label} 实际", f"{label} 结果"]
+    return header + ["结果", "错误"]
+
+
+def reportRow(res: dict):
+    row = [res["ip"], res.get("srcName", "")]
+    items = res.get("items", {})
+    for name in VERSION_ITEMS:
+        item = items.get(name, {})
+        row += [item.get("expected", ""), item.get("actual", ""), "OK" if item.get("ok") else "NG"]
+    return row + ["OK" if res["ok"] else "NG", res.get("error", "")]
+
+
+def writeReport(path, results):
+    """
+    按扩展名写 CSV 或 XLSX 报告，每台机器人一行，每个组件占 期望 / 实际 / 结果 三列
+    """
+    if path.lower().endswith(".xlsx"):
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("版本核查")
+        ws.append(reportHeader())
+        ng = PatternFill("solid", fgColor="FFC7CE")
+        for res in results:
+            row = reportRow(res)
+            if not res["ok"]:
+                row = [WriteOnlyCell(ws, v) for v in row]
+                for cell in row:
+                    if cell.value == "NG":
+                        cell.fill = ng
+            ws.append(row)
+        wb.save(path)
+    else:
+        # utf-8-sig 让 Excel 直接打开时中文不乱码
+        with open(path, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.writer(f)
+            writer.writerow(reportHeader())
+            for res in results:
+                writer.writerow(reportRow(res))
+
+
+class AuditThread(QThread):
+    sigRow = Signal(object)  # auditRobot 的结果
+
+    def __init__(self):
+        super().__init__()
+        self.ips = []
+        self.concurrency = 64
+        self.xlsx = ""
+        self.results = []
+
+    def auditOne(self, ip, matcher):
+        try:
+            res = auditRobot(ip, matcher)
+        except Exception as e:
+            res = {"ip": ip, "ok": False, "error": str(e)}
+        self.results.append(res)
+        self.sigRow.emit(res)
+
+    def run(self):
+        self.results = []
+        try:
+            matcher = versionMatcher(VersionSheet.load(self.xlsx))
+        except Exception as e:
+            printLog(f"读取版本配置表失败 {self.xlsx}", e)
+            return
+        printLog(f"版本核查 {len(self.ips)} 台，并发 {self.concurrency}")
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for ip in self.ips:
+                executor.submit(self.auditOne, ip, matcher)
+        passed = sum(1 for res in self.results if res["ok"])
+        printLog(f"版本核查完成 通过 {passed} 台，不通过 {len(self.results) - passed} 台")
+
+
+class VersionAudit(QWidget):
+    META = {
+        "title": "批量版本核查"
+    }
+
+    def __init__(self):
+        super().__init__()
+
+        self.workThread = AuditThread()
+        self.model = QStandardItemModel()
+        self.initUI()
+
+        self.workThread.sigRow.connect(self.slotRow)
+        self.workThread.finished.connect(self.slotWorkThreadFinished)
+
+    def initUI(self):
+        layout = QVBoxLayout(self)
+
+        hLayout = QHBoxLayout()
+        layout.addLayout(hLayout)
+        hLayout.addWidget(QLabel("并发数:"))
+        self.concurrencySpinBox = QSpinBox()
+        self.concurrencySpinBox.setRange(1, 512)
+        try:
+            self.concurrencySpinBox.setValue(int(cfg[self.__class__.__name__, "concurrency"]))
+        except:
+            self.concurrencySpinBox.setValue(64)
+        hLayout.addWidget(self.concurrencySpinBox)
+        self.summaryLabel = QLabel()
+        hLayout.addWidget(self.summaryLabel)
+        hLayout.addStretch()
+        self.importButton = QPushButton("导入 IP 列表")
+        hLayout.addWidget(self.importButton)
+        self.startButton = QPushButton("开始核查")
+        hLayout.addWidget(self.startButton)
+        self.exportButton = QPushButton("导出报告")
+        self.exportButton.setEnabled(False)
+        hLayout.addWidget(self.exportButton)
+
+        splitter = QSplitter(Qt.Orientation.Horizontal)
+        layout.addWidget(splitter)
+
+        leftWidget = QWidget()
+        leftLayout = QVBoxLayout(leftWidget)
+        leftLayout.setContentsMargins(0, 0, 0, 0)
+        leftLayout.addWidget(QLabel("IP 列表（IP / CIDR / 范围）:"))
+        self.targetsEdit = QPlainTextEdit()
+        leftLayout.addWidget(self.targetsEdit)
+        splitter.addWidget(leftWidget)
+
+        self.tableView = QTableView()
+        self.tableView.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
+        self.tableView.setSortingEnabled(True)
+        self.tableView.setModel(self.model)
+        splitter.addWidget(self.tableView)
+        splitter.setStretchFactor(1, 3)
+
+        self.importButton.clicked.connect(self.slotImportButtonClicked)
+        self.startButton.clicked.connect(self.slotStartButtonClicked)
+        self.exportButton.clicked.connect(self.slotExportButtonClicked)
+
+    def slotImportButtonClicked(self):
+        file = QFileDialog.getOpenFileName(self, "导入 IP 列表", "", "text file (*.txt *.csv);;all (*)")
+        if not file[0]:
+            return
+        with open(file[0], "r", encoding="utf-8") as f:
+            self.targetsEdit.appendPlainText(f.read())
+
+    def slotStartButtonClicked(self):
+        try:
+            ips = parseTargets(self.targetsEdit.toPlainText())
+        except Exception as e:
+            printLog("IP 列表格式错误：", e)
+            return
+        if not ips:
+            printLog("没有需要核查的 IP")
+            return
+        xlsx = versionSheetPath()
+        if not os.path.exists(xlsx):
+            printLog(f"没有找到版本配置表 {xlsx}")
+            return
+
+        self.model.clear()
+        self.model.setHorizontalHeaderLabels(["IP", "SRC"] + VERSION_LABELS + ["结果"])
+        concurrency = self.concurrencySpinBox.value()
+        if cfg[self.__class__.__name__, "concurrency"] != str(concurrency):
+            cfg[self.__class__.__name__, "concurrency"] = concurrency
+        self.startButton.setDisabled(True)
+        self.exportButton.setDisabled(True)
+        self.workThread.ips = ips
+        self.workThread.concurrency = concurrency
+        self.workThread.xlsx = xlsx
+        self.workThread.start()
+
+    def slotRow(self, res):
+        row = [QStandardItem(res["ip"]), QStandardItem(res.get("srcName", ""))]
+        items = res.get("items", {})
+        for name in VERSION_ITEMS:
+            item = items.get(name, {})
+            cell = QStandardItem(item.get("actual", ""))
+            cell.setToolTip(f"期望：{item.get('expected', '')}")
+            cell.setForeground(QColor(25, 200, 25) if item.get("ok") else QColor(200, 25, 25))
+            row.append(cell)
+        result = QStandardItem("OK" if res["ok"] else res.get("error", "NG"))
+        result.setForeground(QColor(25, 200, 25) if res["ok"] else QColor(200, 25, 25))
+        row.append(result)
+        self.model.appendRow(row)
+        passed = sum(1 for r in self.workThread.results if r["ok"])
+        self.summaryLabel.setText(f"已完成 {len(self.workThread.results)} / {len(self.workThread.ips)}，通过 {passed}")
+
+    def slotExportButtonClicked(self):
+        file = QFileDialog.getSaveFileName(self, "导出报告", "version_audit.xlsx",
+                                           "Excel (*.xlsx);;CSV (*.csv)")
+        if not file[0]:
+            return
+        try:
+            writeReport(file[0], sorted(self.workThread.results, key=lambda r: ipaddress.ip_address(r["ip"])))
+        except Exception as e:
+            printLog(f"导出报告失败 {file[0]}", e)
+            return
+        printLog(f"导出报告 {file[0]}")
+
+    def slotWorkThreadFinished(self):
+        self.startButton.setEnabled(True)
+        self.exportButton.setEnabled(bool(self.workThread.results))
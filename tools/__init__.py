@@ -1,4 +1,7 @@
 from .ExportRobotInfo import ExportRobotInfo
 from .OnlineActivation import OnlineActivation
 from .UpgradeRBK import UpgradeRBK
-from .RBKVersionValidator import RBKVersionValidator
\ No newline at end of file
+from .RBKVersionValidator import RBKVersionValidator
+from .FleetUpgradeRBK import FleetUpgradeRBK
+from .VersionAudit import VersionAudit
+from .RobotDiscovery import RobotDiscovery